@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+
+from ..utils.validators import get_error_message
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with a bounded wait queue. The limit adapts with AIMD:
+    +1 per limit's worth of fast requests, x0.9 when latency exceeds the target.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        max_queue: int,
+        max_wait_seconds: float,
+        latency_target_seconds: float,
+        retry_after_seconds: int,
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.latency_target_seconds = latency_target_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.latency_ewma = 0.0
+        self._waiters: deque = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        return self.in_flight >= int(self.limit) or bool(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the bounded queue if needed. False means shed."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Unlike wait_for, asyncio.wait leaves the future alone on timeout or cancellation
+            await asyncio.wait([waiter], timeout=self.max_wait_seconds)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(waiter)
+            self.shed += 1
+            return False
+
+        # A releasing request counted us in and handed us a slot
+        self.admitted += 1
+        return True
+
+    def release(self, latency: float):
+        """Return a slot and feed the observed latency into the limit"""
+        self.latency_ewma = latency if self.latency_ewma == 0 else 0.9 * self.latency_ewma + 0.1 * latency
+
+        now = time.monotonic()
+        if latency > self.latency_target_seconds:
+            # Decrease at most once per target interval so one slow burst doesn't collapse the limit
+            if now - self._last_decrease > self.latency_target_seconds:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        self._hand_off()
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Leave the queue; a slot already handed to this waiter is released again"""
+        if waiter.done():
+            self._hand_off()
+        else:
+            waiter.cancel()
+            self._waiters.remove(waiter)
+
+    def _hand_off(self):
+        """Free a slot, then admit queued requests for as long as the (possibly raised) limit allows"""
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 2),
+        }
+
+
+class AdmissionController:
+    """Per-route-class limiters; analytics is shed before lead submission"""
+
+    def __init__(self):
+        self.submit = AdaptiveLimiter(
+            "submit",
+            initial_limit=int(os.environ.get('ADMISSION_SUBMIT_LIMIT', '32')),
+            min_limit=4,
+            max_limit=int(os.environ.get('ADMISSION_SUBMIT_MAX_LIMIT', '128')),
+            max_queue=int(os.environ.get('ADMISSION_SUBMIT_QUEUE', '64')),
+            max_wait_seconds=2.0,
+            latency_target_seconds=float(os.environ.get('ADMISSION_SUBMIT_TARGET_MS', '1500')) / 1000,
+            retry_after_seconds=2,
+        )
+        self.analytics = AdaptiveLimiter(
+            "analytics",
+            initial_limit=int(os.environ.get('ADMISSION_ANALYTICS_LIMIT', '16')),
+            min_limit=1,
+            max_limit=64,
+            max_queue=8,
+            max_wait_seconds=0.5,
+            latency_target_seconds=0.5,
+            retry_after_seconds=10,
+        )
+
+    def classify(self, scope) -> Optional[AdaptiveLimiter]:
+        if scope["method"] != "POST":
+            return None
+        path = scope["path"]
+        if path in ("/api/landings/submit", "/api/landings/demo/schedule"):
+            return self.submit
+        if path.startswith("/api/analytics/"):
+            return self.analytics
+        return None
+
+    def should_shed_early(self, limiter: AdaptiveLimiter) -> bool:
+        # Leads matter more than analytics: drop analytics while submissions queue up
+        return limiter is self.analytics and self.submit.saturated
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        return {"submit": self.submit.metrics(), "analytics": self.analytics.metrics()}
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionControlMiddleware:
+    """Fast 503 with Retry-After instead of letting overload degrade every request"""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.controller.classify(scope) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.controller.should_shed_early(limiter):
+            limiter.shed += 1
+            await self.reject(send, limiter)
+            return
+
+        if not await limiter.acquire():
+            await self.reject(send, limiter)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
+
+    async def reject(self, send, limiter: AdaptiveLimiter):
+        body = json.dumps({"detail": get_error_message('overloaded')}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(limiter.retry_after_seconds).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,264 @@
+import hashlib
+import hmac
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import zlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .spam_filter import get_scope_client_ip, get_scope_header
+from .compression import MAX_DECOMPRESSED_REQUEST_BYTES
+from ..services.spam_filter import spam_filter
+from ..utils.validators import validate_whatsapp
+
+logger = logging.getLogger(__name__)
+
+# Routes worth replaying: lead writes and analytics ingestion
+CAPTURE_PATHS = {
+    "/api/landings/submit",
+    "/api/landings/demo/schedule",
+}
+CAPTURE_PREFIXES = ("/api/analytics/",)
+
+# Request headers kept in the capture; everything else (cookies, auth) is dropped
+CAPTURE_HEADERS = [b"content-type", b"user-agent", b"accept-encoding", b"origin"]
+
+MAX_CAPTURE_BODY_BYTES = 64 * 1024
+
+# Free-text fields replaced wholesale; emails, numbers and IPs get stable pseudonyms
+REDACTED_FIELDS = {"name", "company", "notes"}
+URL_FIELDS = {"referrer", "page_url", "url"}
+
+# Scalar keys kept anywhere, including free-form maps (analytics properties,
+# utm, query strings)
+ALLOWED_FREEFORM_KEYS = {
+    "page", "cta_type", "cta_location",
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "gclid", "gbraid", "wbraid", "fbclid", "msclkid", "device", "placement", "dkinsertion",
+    "referrer", "page_url",
+}
+FREEFORM_FIELDS = {"properties", "utm"}
+
+# Keys of the request models (LandingSubmission, DemoScheduling, AnalyticsEvent,
+# batch payloads) kept outside free-form maps. Every other key, at any level
+# of any captured body, is client-controlled and redacted
+BODY_KEYS = {
+    "name", "email", "whatsapp", "company", "notes", "action_type", "website",
+    "preferred_datetime", "timezone", "utm",
+    "events", "event", "properties", "timestamp", "session_id", "user_agent", "ip_address",
+}
+
+
+class Sanitizer:
+    """
+    Replace personal data with pseudonyms that keep a capture's shape: the
+    same email maps to the same fake email within a capture (so dedupe and
+    rate limits behave as in production), valid values stay valid and
+    known-bad emails stay known-bad. Keyed with a random per-process salt so
+    pseudonyms can't be reversed by hashing candidate emails.
+    """
+
+    def __init__(self, salt: Optional[bytes] = None):
+        self.salt = salt or secrets.token_bytes(16)
+
+    def digest(self, value: str) -> str:
+        return hmac.new(self.salt, value.strip().lower().encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def email(self, value: Any) -> Any:
+        if not isinstance(value, str) or "@" not in value:
+            return "invalid-email"
+        allowed, _ = spam_filter.check_email(value)
+        domain = "example.com" if allowed else "mailinator.com"
+        return f"lead-{self.digest(value)[:12]}@{domain}"
+
+    def whatsapp(self, value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        valid, _, _ = validate_whatsapp(value)
+        if not valid:
+            return "0" * min(len(value), 9)
+        return "+55119" + str(int(self.digest(value)[:12], 16))[-7:].zfill(7)
+
+    def ip_address(self, value: str) -> str:
+        if not value:
+            return value
+        digest = bytes.fromhex(self.digest(value)[:6])
+        return "10.{}.{}.{}".format(*digest)
+
+    def url(self, value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        parts = urlsplit(value)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))  # Query strings carry tokens and emails
+
+    @staticmethod
+    def keep(key: str, value: Any, freeform: bool) -> bool:
+        """Whether a key of a captured map is kept (sanitized) rather than redacted"""
+        if key in ALLOWED_FREEFORM_KEYS:
+            return not isinstance(value, (dict, list))
+        return not freeform and key in BODY_KEYS
+
+    def query(self, query_string: str) -> str:
+        """Keep allowlisted query parameters, drop the rest"""
+        return urlencode([(k, self.value(k, v)) for k, v in parse_qsl(query_string) if k in ALLOWED_FREEFORM_KEYS])
+
+    def value(self, key: str, value: Any) -> Any:
+        if isinstance(value, dict):
+            freeform = key in FREEFORM_FIELDS
+            return {k: self.value(k, v) if self.keep(k, v, freeform) else "[redacted]" for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.value(key, item) for item in value]
+        if value is None or value == "":
+            return value
+        if key == "email":
+            return self.email(value)
+        if key in ("whatsapp", "phone"):
+            return self.whatsapp(value)
+        if key == "ip_address" and isinstance(value, str):
+            return self.ip_address(value)
+        if key in REDACTED_FIELDS:
+            return f"Lead {self.digest(str(value))[:6]}"
+        if key == "website":
+            return "x"  # Honeypot: only whether it was filled matters
+        if key in URL_FIELDS:
+            return self.url(value)
+        return value
+
+
+class CaptureWriter:
+    """Append JSON lines from a background thread so requests never wait on disk"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]):
+        self._queue.put(json.dumps(record, default=str, ensure_ascii=False))
+
+    def _run(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as capture_file:
+                while True:
+                    line = self._queue.get()
+                    capture_file.write(line + "\n")
+                    if self._queue.empty():
+                        capture_file.flush()
+        except OSError as e:
+            logger.error("Traffic capture stopped, could not write %s: %s", self.path, e)
+
+
+def decode_body(body: bytes, content_encoding: str) -> Any:
+    """Request body as JSON (or text), undoing gzip so the capture stays readable"""
+    if content_encoding == "gzip":
+        decompressor = zlib.decompressobj(31)
+        try:
+            body = decompressor.decompress(body, MAX_DECOMPRESSED_REQUEST_BYTES)
+        except zlib.error:
+            return None
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return body.decode("utf-8", "replace")
+
+
+class TrafficCaptureMiddleware:
+    """
+    Record sanitized requests to the replayable routes as JSON lines
+    (see scripts/replay_traffic.py). Enabled by TRAFFIC_CAPTURE_PATH and
+    sampled with TRAFFIC_CAPTURE_SAMPLE_RATE. Sits outside admission
+    control and the spam filter so the capture reflects offered load,
+    including requests those layers reject.
+    """
+
+    def __init__(self, app, path: Optional[str] = None, sample_rate: Optional[float] = None):
+        self.app = app
+        path = path if path is not None else os.environ.get('TRAFFIC_CAPTURE_PATH', '')
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE', '1'))
+        self.writer = CaptureWriter(Path(path)) if path else None
+        self.sanitizer = Sanitizer()
+
+    def should_capture(self, scope) -> bool:
+        if self.writer is None or scope["type"] != "http":
+            return False
+        path = scope["path"]
+        if path not in CAPTURE_PATHS and not path.startswith(CAPTURE_PREFIXES):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if not self.should_capture(scope):
+            await self.app(scope, receive, send)
+            return
+
+        received_at = time.time()
+        started = time.perf_counter()
+        status_code = None
+
+        # Read the body up front: layers below may reject a request without reading it
+        buffered = []
+        body_size = 0
+        while body_size <= MAX_CAPTURE_BODY_BYTES:
+            message = await receive()
+            buffered.append(message)
+            if message["type"] != "http.request":
+                break
+            body_size += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        chunks = [message.get("body", b"") for message in buffered if message["type"] == "http.request"]
+        pending = list(buffered)
+
+        async def receive_wrapper():
+            if pending:
+                return pending.pop(0)
+            return await receive()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.record(scope, received_at, time.perf_counter() - started, chunks, body_size, status_code)
+
+    def record(self, scope, received_at: float, duration: float, chunks, body_size: int, status_code: Optional[int]):
+        try:
+            content_encoding = get_scope_header(scope, b"content-encoding").strip().lower()
+            headers = {}
+            for name in CAPTURE_HEADERS:
+                value = get_scope_header(scope, name)
+                if value:
+                    headers[name.decode("latin-1")] = value
+
+            entry = {
+                "ts": received_at,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": self.sanitizer.query(scope.get("query_string", b"").decode("latin-1")),
+                "headers": headers,
+                "client_ip": self.sanitizer.ip_address(get_scope_client_ip(scope)),
+                "gzip": content_encoding == "gzip",
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 3),
+            }
+            if body_size > MAX_CAPTURE_BODY_BYTES:
+                entry["body_truncated"] = body_size
+            else:
+                entry["body"] = self.sanitizer.value("", decode_body(b"".join(chunks), content_encoding))
+
+            self.writer.write(entry)
+        except Exception as e:
+            logger.warning("Could not capture request to %s: %s", scope["path"], e)
@@ -0,0 +1,281 @@
+import json
+import os
+import zlib
+import logging
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from .spam_filter import get_scope_header
+from ..utils.validators import get_error_message
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip is always available
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are sent as-is; compression wouldn't pay for itself
+MIN_COMPRESS_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '500'))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+# Endpoints that accept gzip-encoded request bodies
+GZIP_REQUEST_PATHS = {
+    "/api/analytics/batch",
+}
+MAX_COMPRESSED_REQUEST_BYTES = 256 * 1024
+MAX_DECOMPRESSED_REQUEST_BYTES = 1024 * 1024
+
+
+class GzipCompressor:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self):
+        # Quality 4 compresses better than gzip -6 at similar speed; 11 is far too slow per request
+        self._compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Server preference when the client accepts several encodings equally
+COMPRESSORS = {"gzip": GzipCompressor}
+if zstandard is not None:
+    COMPRESSORS = {"zstd": ZstdCompressor, **COMPRESSORS}
+if brotli is not None:
+    COMPRESSORS = {"br": BrotliCompressor, **COMPRESSORS}
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Best supported encoding for an Accept-Encoding header, or None for identity"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+
+    best, best_quality = None, 0.0
+    for encoding in COMPRESSORS:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(status: int, headers: MutableHeaders) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts (brotli and
+    zstd when their packages are installed, gzip otherwise). Single-message
+    responses under MIN_COMPRESS_SIZE are left alone; streaming responses are
+    compressed chunk by chunk and flushed so clients get data as it is sent.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(get_scope_header(scope, b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message  # Held until the first body chunk decides
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(scope=start_message)
+                headers.add_vary_header("Accept-Encoding")
+                if not is_compressible(start_message["status"], headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = COMPRESSORS[encoding]()
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            if more_body:
+                data = compressor.compress(body) + compressor.flush()
+            else:
+                data = compressor.compress(body) + compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def send_error(send, status: int, error_key: str):
+    body = json.dumps({"detail": get_error_message(error_key)}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class GzipRequestMiddleware:
+    """
+    Decompress `Content-Encoding: gzip` request bodies on batch endpoints.
+    Both the compressed and the decompressed size are capped so a small
+    gzip bomb can't exhaust memory; uncompressed bodies get the
+    decompressed cap.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in GZIP_REQUEST_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        content_encoding = get_scope_header(scope, b"content-encoding").strip().lower()
+        if content_encoding not in ("", "identity", "gzip"):
+            await send_error(send, 415, 'unsupported_encoding')
+            return
+        compressed = content_encoding == "gzip"
+        limit = MAX_COMPRESSED_REQUEST_BYTES if compressed else MAX_DECOMPRESSED_REQUEST_BYTES
+
+        content_length = get_scope_header(scope, b"content-length").strip()
+        if content_length.isdigit() and int(content_length) > limit:
+            await send_error(send, 413, 'payload_too_large')
+            return
+
+        received = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            received += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(received) > limit:
+                await send_error(send, 413, 'payload_too_large')
+                return
+
+        body = bytes(received)
+        if compressed:
+            decompressor = zlib.decompressobj(31)
+            try:
+                body = decompressor.decompress(body, MAX_DECOMPRESSED_REQUEST_BYTES)
+            except zlib.error as e:
+                logger.info("Invalid gzip body on %s: %s", scope["path"], e)
+                await send_error(send, 400, 'invalid_encoding')
+                return
+            if decompressor.unconsumed_tail:
+                await send_error(send, 413, 'payload_too_large')
+                return
+            if not decompressor.eof:
+                await send_error(send, 400, 'invalid_encoding')
+                return
+
+        headers = [(name, value) for name, value in scope["headers"] if name not in (b"content-encoding", b"content-length")]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        scope = dict(scope, headers=headers)
+
+        body_sent = False
+
+        async def receive_wrapper():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_wrapper, send)
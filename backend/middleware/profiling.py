@@ -0,0 +1,46 @@
+import hmac
+import os
+import random
+import logging
+
+from ..services.profiler import request_profiler
+from .spam_filter import get_scope_header
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """
+    Profile individual API requests when the X-Profile-Request header carries
+    the admin token, or at random with PROFILE_SAMPLE_RATE.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.admin_token = os.environ.get('ADMIN_TOKEN', '')
+
+    def should_profile(self, scope) -> bool:
+        if not scope["path"].startswith("/api/") or scope["path"].startswith("/api/admin/"):
+            return False
+        requested = get_scope_header(scope, b"x-profile-request")
+        if requested and self.admin_token and hmac.compare_digest(requested, self.admin_token):
+            return True
+        return request_profiler.sample_rate > 0 and random.random() < request_profiler.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = request_profiler.start(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message.setdefault("headers", []).append((b"x-profile-id", profile.id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await request_profiler.finish(profile)
@@ -0,0 +1,116 @@
+import ipaddress
+import json
+import os
+import logging
+from typing import List, Union
+
+from ..services.spam_filter import spam_filter
+from ..utils.validators import get_error_message
+
+logger = logging.getLogger(__name__)
+
+# Routes that write to the database or call the KAVVI API
+PROTECTED_PATHS = {
+    "/api/landings/submit",
+    "/api/landings/demo/schedule",
+}
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(value: str) -> List[Network]:
+    """Comma separated IPs/CIDRs, skipping invalid entries"""
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning("Ignoring invalid TRUSTED_PROXIES entry: %s", item)
+    return networks
+
+
+# Reverse proxies allowed to set X-Forwarded-For: loopback and private ranges
+# by default (a load balancer inside the same network), TRUSTED_PROXIES overrides
+TRUSTED_PROXIES = parse_networks(os.environ.get(
+    'TRUSTED_PROXIES', "127.0.0.0/8,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,::1/128,fc00::/7"
+))
+
+
+def is_trusted_proxy(ip: str, trusted: List[Network]) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted)
+
+
+def resolve_client_ip(peer: str, forwarded: str, trusted: List[Network] = TRUSTED_PROXIES) -> str:
+    """
+    Client IP from the connecting peer and X-Forwarded-For. Each proxy appends
+    the address it received the request from, so the client is the right-most
+    hop that isn't a trusted proxy; hops left of it are client-controlled. The
+    header is ignored unless the peer itself is a trusted proxy.
+    """
+    if not forwarded or not is_trusted_proxy(peer, trusted):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop, trusted):
+            return hop
+    return hops[0] if hops else peer
+
+
+def get_scope_client_ip(scope) -> str:
+    """Extract client IP from an ASGI scope"""
+    client = scope.get("client")
+    peer = client[0] if client else ""
+    # Repeated headers are one comma separated list
+    forwarded = ",".join(
+        value.decode("latin-1") for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+    )
+    return resolve_client_ip(peer, forwarded)
+
+
+def get_scope_header(scope, header: bytes) -> str:
+    """Read a single header from an ASGI scope"""
+    for name, value in scope.get("headers", []):
+        if name == header:
+            return value.decode("latin-1")
+    return ""
+
+
+class SpamFilterMiddleware:
+    """Reject bot traffic on protected routes before the body is parsed"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in PROTECTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = get_scope_client_ip(scope)
+        user_agent = get_scope_header(scope, b"user-agent")
+
+        allowed, reason = spam_filter.check_request(client_ip, user_agent)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        logger.info("Spam filter rejected %s from %s: %s", scope['path'], client_ip, reason)
+
+        body = json.dumps({"detail": get_error_message('honeypot_detected')}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 403,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr, validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import re
 import uuid
@@ -99,10 +99,25 @@ class AnalyticsEvent(BaseModel):
 class LandingResponse(BaseModel):
     success: bool
     message: str
+    lead_id: Optional[str] = None
     trial_expires: Optional[datetime] = None
     demo_scheduled: Optional[datetime] = None
     calendar_event_id: Optional[str] = None
 
+class LeadStatusResponse(BaseModel):
+    """Public view of a lead for confirmation pages - no contact details"""
+    lead_id: str
+    action_type: str
+    status: str
+    created_at: datetime
+    trial_expires: Optional[datetime] = None
+    demo_scheduled: Optional[datetime] = None
+
+class LeadUpdate(BaseModel):
+    """Lead fields that can be changed through the admin API"""
+    status: Optional[str] = Field(None, regex="^[a-z_]{1,32}$")
+    external_lead_id: Optional[str] = Field(None, min_length=1, max_length=100)
+
 # Database models for tracking
 class LeadRecord(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -114,11 +129,13 @@ class LeadRecord(BaseModel):
     action_type: str  # trial or demo
     utm_data: Optional[Dict[str, Any]] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None
     trial_expires: Optional[datetime] = None
     demo_scheduled: Optional[datetime] = None
     calendar_event_id: Optional[str] = None
     external_lead_id: Optional[str] = None  # ID from KAVVI API
     status: str = "active"
+    attribution_history: List[Dict[str, Any]] = Field(default_factory=list)  # One entry per submission
 
 class RateLimitRecord(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
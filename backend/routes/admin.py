@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import PlainTextResponse
+import hmac
+import os
+import logging
+
+from ..models import LeadUpdate
+from ..services.profiler import request_profiler
+from ..middleware.admission import admission_controller
+from ..services.lifecycle import services
+
+logger = logging.getLogger(__name__)
+
+def require_admin(request: Request):
+    """Require the X-Admin-Token header to match ADMIN_TOKEN"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        # Admin endpoints are disabled unless a token is configured
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    provided = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(provided, admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+async def list_profiles():
+    """List the slowest profiled requests"""
+    return {
+        "sample_rate": request_profiler.sample_rate,
+        "profiles": [profile.summary() for profile in request_profiler.slowest()]
+    }
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "speedscope"):
+    """Get a single request profile as speedscope JSON or collapsed stacks"""
+    profile = request_profiler.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return profile.speedscope()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Operational metrics for the API process"""
+    return {
+        "admission": admission_controller.metrics(),
+        "lead_cache": services.lead_store.cache.metrics() if services.lead_store else None,
+        "lead_webhooks": services.lead_events.metrics() if services.lead_events else None
+    }
+
+@router.patch("/leads/{lead_id}")
+async def update_lead(lead_id: str, update: LeadUpdate):
+    """Change a lead's status or backfill its KAVVI ID"""
+    fields = update.dict(exclude_none=True)
+    if not fields:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    if not services.lead_store:
+        raise HTTPException(status_code=503, detail="Service unavailable")
+
+    lead = await services.lead_store.update(lead_id, fields)
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return lead.dict(exclude={"attribution_history"})
@@ -1,21 +1,24 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
+from pydantic import ValidationError
 from datetime import datetime
+import json
 import logging
 from typing import Dict, Any
 
 from ..models import AnalyticsEvent
-from ..services.external_api import kavvi_api
+from ..middleware.spam_filter import get_scope_client_ip
+from ..services.lifecycle import services
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+# Upper bound on events accepted in one batch request
+MAX_BATCH_EVENTS = 50
+
 def get_client_ip(request: Request) -> str:
-    """Extract client IP from request"""
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host
+    """Extract client IP from request (X-Forwarded-For only through trusted proxies)"""
+    return get_scope_client_ip(request.scope)
 
 @router.post("/track")
 async def track_event(
@@ -44,7 +47,7 @@ async def track_event(
         }
         
         # Fire and forget - don't block the response
-        await kavvi_api.send_analytics_event(analytics_payload)
+        await services.kavvi_api.send_analytics_event(analytics_payload)
         
         return {
             "success": True,
@@ -52,7 +55,7 @@ async def track_event(
         }
         
     except Exception as e:
-        logger.warning(f"Analytics tracking error: {e}")
+        logger.warning("Analytics tracking error: %s", e)
         # Don't fail - analytics is not critical
         return {
             "success": False,
@@ -80,7 +83,7 @@ async def track_page_view(
         }
         
         # Send page view event
-        await kavvi_api.send_analytics_event({
+        await services.kavvi_api.send_analytics_event({
             "event": "landing_view",
             "properties": event_properties
         })
@@ -88,7 +91,7 @@ async def track_page_view(
         return {"success": True}
         
     except Exception as e:
-        logger.warning(f"Page view tracking error: {e}")
+        logger.warning("Page view tracking error: %s", e)
         return {"success": False}
 
 @router.post("/cta_click")
@@ -110,7 +113,7 @@ async def track_cta_click(
             **cta_data.get("utm", {})
         }
         
-        await kavvi_api.send_analytics_event({
+        await services.kavvi_api.send_analytics_event({
             "event": "cta_click",
             "properties": event_properties
         })
@@ -118,5 +121,60 @@ async def track_cta_click(
         return {"success": True}
         
     except Exception as e:
-        logger.warning(f"CTA click tracking error: {e}")
-        return {"success": False}
\ No newline at end of file
+        logger.warning("CTA click tracking error: %s", e)
+        return {"success": False}
+
+@router.post("/batch")
+async def track_batch(
+    request: Request,
+    background_tasks: BackgroundTasks
+):
+    """Track a batch of analytics events (JSON array, {"events": [...]} or sendBeacon payload)"""
+    try:
+        # sendBeacon posts text/plain to avoid a CORS preflight, so parse the raw body
+        payload = json.loads(await request.body() or b"[]")
+        raw_events = payload.get("events") if isinstance(payload, dict) else payload
+        if not isinstance(raw_events, list):
+            raise ValueError("events must be a list")
+    except ValueError as e:
+        logger.warning("Invalid analytics batch: %s", e)
+        return {"success": False, "message": "Invalid batch payload"}
+
+    # Request info is the same for every event in the batch
+    client_ip = get_client_ip(request)
+    user_agent = request.headers.get("User-Agent", "")
+    referrer = request.headers.get("Referer", "")
+    received_at = datetime.utcnow().isoformat()
+
+    events = []
+    rejected = max(0, len(raw_events) - MAX_BATCH_EVENTS)
+    for raw_event in raw_events[:MAX_BATCH_EVENTS]:
+        try:
+            event_data = AnalyticsEvent(**raw_event)
+        except (ValidationError, TypeError):
+            rejected += 1
+            continue
+
+        events.append({
+            "event": event_data.event,
+            "properties": {
+                "page": "whatsapp-lead-generation",
+                "referrer": referrer,
+                **event_data.properties,
+                "ip_address": client_ip,
+                "user_agent": user_agent,
+                "timestamp": received_at
+            },
+            "session_id": event_data.session_id,
+            "timestamp": event_data.timestamp.isoformat()
+        })
+
+    if events:
+        # Sent upstream after the response, in a single request
+        background_tasks.add_task(services.kavvi_api.send_analytics_events, events)
+
+    return {
+        "success": True,
+        "accepted": len(events),
+        "rejected": rejected
+    }
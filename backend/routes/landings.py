@@ -1,35 +1,58 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime, timedelta
+import hashlib
+import json
 import logging
 import asyncio
-from typing import Optional
+from typing import Any, Optional, Tuple
+import os
 
-from ..models import LandingSubmission, DemoScheduling, LandingResponse, LeadRecord
-from ..services.external_api import kavvi_api, google_calendar
-from ..services.rate_limiter import RateLimiter
+from ..models import LandingSubmission, DemoScheduling, LandingResponse, LeadRecord, LeadStatusResponse
+from ..middleware.spam_filter import get_scope_client_ip
+from ..services.lifecycle import services
+from ..services.spam_filter import spam_filter
 from ..utils.validators import validate_whatsapp, validate_email, sanitize_input, get_error_message
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from ..utils.scheduling import (
+    validate_slot, generate_slots, get_zone, to_business_time, to_utc_naive, BUSINESS_TIMEZONE, SLOT_MINUTES
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/landings", tags=["landings"])
 
-# Database connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Repeated identical submissions within this window get the first response without reprocessing
+SUBMIT_DEDUPE_SECONDS = int(os.environ.get('SUBMIT_DEDUPE_SECONDS', '60'))
+# How long a duplicate waits for the first request's response before a plain acknowledgement
+DEDUPE_WAIT_SECONDS = 2.0
+
+def dedupe_key(kind: str, *values: Any) -> str:
+    """Claim key for a submission: identical payloads share it, corrected resubmits don't"""
+    digest = hashlib.sha256(json.dumps(values, default=str).encode("utf-8")).hexdigest()[:32]
+    return f"{kind}:{digest}"
 
-# Initialize rate limiter
-rate_limiter = RateLimiter(db.rate_limits)
+async def claim_submission(key: str) -> Tuple[bool, Optional[Any]]:
+    """
+    Claim a submission across all workers. A duplicate gets the response the
+    first request stored, waiting briefly while that request is in flight;
+    if the first request failed and released the key, the duplicate claims it.
+    Returns: (claimed, previous_response)
+    """
+    claimed, stored = await services.shared_state.claim(key, SUBMIT_DEDUPE_SECONDS)
+    deadline = asyncio.get_running_loop().time() + DEDUPE_WAIT_SECONDS
+    while not claimed and stored is None and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.1)
+        claimed, stored = await services.shared_state.claim(key, SUBMIT_DEDUPE_SECONDS)
+    return claimed, json.loads(stored) if stored else None
+
+async def store_response(key: str, response: Any):
+    """Keep a claimed submission's response for its duplicates"""
+    await services.shared_state.complete(key, json.dumps(jsonable_encoder(response)), SUBMIT_DEDUPE_SECONDS)
 
 def get_client_ip(request: Request) -> str:
-    """Extract client IP from request"""
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host
+    """Extract client IP from request (X-Forwarded-For only through trusted proxies)"""
+    return get_scope_client_ip(request.scope)
 
 @router.post("/submit", response_model=LandingResponse)
 async def submit_landing_form(
@@ -37,23 +60,41 @@ async def submit_landing_form(
     request: Request
 ):
     """Handle landing page form submissions"""
+    claimed_key = None
     try:
         client_ip = get_client_ip(request)
         user_agent = request.headers.get("User-Agent", "")
         
+        # Reject known-bad emails before touching the database
+        email_ok, _ = spam_filter.check_email(submission.email, client_ip)
+        if not email_ok:
+            raise HTTPException(status_code=400, detail=get_error_message('invalid_email'))
+        
+        # Double submits (across all workers) get the first response without reaching Mongo or upstream
+        claim_key = dedupe_key(
+            "submit", submission.email.lower(), submission.whatsapp, submission.name,
+            submission.company, submission.notes, submission.action_type,
+        )
+        claimed, previous = await claim_submission(claim_key)
+        if not claimed:
+            return previous or LandingResponse(success=True, message="Cadastro realizado com sucesso!")
+        claimed_key = claim_key
+        
         # Check rate limits
-        ip_allowed, ip_error = await rate_limiter.check_ip_rate_limit(client_ip)
+        ip_allowed, ip_error = await services.rate_limiter.check_ip_rate_limit(client_ip)
         if not ip_allowed:
-            await rate_limiter.record_attempt(client_ip, submission.email)
+            spam_filter.penalize(client_ip, "rate_limited")
+            await services.rate_limiter.record_attempt(client_ip, submission.email)
             raise HTTPException(status_code=429, detail=ip_error)
         
-        email_allowed, email_error = await rate_limiter.check_email_rate_limit(submission.email)
+        email_allowed, email_error = await services.rate_limiter.check_email_rate_limit(submission.email)
         if not email_allowed:
-            await rate_limiter.record_attempt(client_ip, submission.email)
+            spam_filter.penalize(client_ip, "rate_limited")
+            await services.rate_limiter.record_attempt(client_ip, submission.email)
             raise HTTPException(status_code=429, detail=email_error)
         
         # Record attempt
-        await rate_limiter.record_attempt(client_ip, submission.email)
+        await services.rate_limiter.record_attempt(client_ip, submission.email)
         
         # Validate inputs (additional validation beyond Pydantic)
         whatsapp_valid, normalized_whatsapp, whatsapp_error = validate_whatsapp(submission.whatsapp)
@@ -75,9 +116,12 @@ async def submit_landing_form(
             "utm": submission.utm.dict() if submission.utm else {}
         }
         
-        # Submit to external KAVVI API
-        external_result = await kavvi_api.submit_lead(lead_data)
-        external_lead_id = external_result.get("id") if external_result else None
+        # Only submit to external KAVVI API if this person is not already known upstream
+        existing_lead = await services.lead_store.find_existing(submission.email, normalized_whatsapp)
+        external_lead_id = existing_lead.external_lead_id if existing_lead else None
+        if not external_lead_id:
+            external_result = await services.kavvi_api.submit_lead(lead_data)
+            external_lead_id = external_result.get("id") if external_result else None
         
         # Create local lead record
         lead_record = LeadRecord(
@@ -104,7 +148,7 @@ async def submit_landing_form(
             response_data["message"] = "Trial de 3 dias ativado com sucesso! Acesse sua conta em breve."
             
             # Send analytics event
-            await kavvi_api.send_analytics_event({
+            await services.kavvi_api.send_analytics_event({
                 "event": "trial_started",
                 "properties": {
                     "page": "whatsapp-lead-generation",
@@ -120,7 +164,7 @@ async def submit_landing_form(
             response_data["message"] = "Interesse em demo registrado! Nossa equipe entrará em contato."
             
             # Send analytics event
-            await kavvi_api.send_analytics_event({
+            await services.kavvi_api.send_analytics_event({
                 "event": "form_submit",
                 "properties": {
                     "page": "whatsapp-lead-generation",
@@ -132,11 +176,12 @@ async def submit_landing_form(
                 }
             })
         
-        # Save lead to database
-        await db.leads.insert_one(lead_record.dict())
+        # Save lead to database, merging into an existing lead if any
+        stored_lead, _ = await services.lead_store.upsert(lead_record)
+        response_data["lead_id"] = stored_lead.id if stored_lead else None
         
         # Send form submit analytics event
-        await kavvi_api.send_analytics_event({
+        await services.kavvi_api.send_analytics_event({
             "event": "form_submit",
             "properties": {
                 "page": "whatsapp-lead-generation",
@@ -150,12 +195,18 @@ async def submit_landing_form(
             }
         })
         
-        return LandingResponse(**response_data)
+        response = LandingResponse(**response_data)
+        await store_response(claim_key, response)
+        return response
         
     except HTTPException:
+        if claimed_key:
+            await services.shared_state.release(claimed_key)
         raise
     except Exception as e:
-        logger.error(f"Form submission error: {e}")
+        if claimed_key:
+            await services.shared_state.release(claimed_key)
+        logger.error("Form submission error: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=get_error_message('server_error')
@@ -167,31 +218,37 @@ async def schedule_demo(
     request: Request
 ):
     """Schedule a demo with Google Calendar integration"""
+    claimed_key = None
     try:
         client_ip = get_client_ip(request)
         user_agent = request.headers.get("User-Agent", "")
         
-        # Validate datetime
-        if demo_request.preferred_datetime <= datetime.utcnow():
-            raise HTTPException(
-                status_code=400,
-                detail=get_error_message('future_date_required')
-            )
+        email_ok, _ = spam_filter.check_email(demo_request.email, client_ip)
+        if not email_ok:
+            raise HTTPException(status_code=400, detail=get_error_message('invalid_email'))
         
-        # Check if it's business hours (9 AM - 6 PM Brazil time)
-        demo_hour = demo_request.preferred_datetime.hour
-        if demo_hour < 9 or demo_hour >= 18:
+        # Validate datetime in Brasília business hours, reading naive values in the visitor's timezone
+        slot_valid, slot_error = validate_slot(demo_request.preferred_datetime, demo_request.timezone)
+        if not slot_valid:
             raise HTTPException(
                 status_code=400,
-                detail=get_error_message('business_hours_only')
+                detail=get_error_message(slot_error)
             )
+        demo_local = to_business_time(demo_request.preferred_datetime, demo_request.timezone)
+        demo_message = f"Demo agendado para {demo_local.strftime('%d/%m/%Y às %H:%M')} (horário de Brasília)"
         
-        # Check if it's a weekday
-        if demo_request.preferred_datetime.weekday() >= 5:
-            raise HTTPException(
-                status_code=400,
-                detail=get_error_message('weekdays_only')
-            )
+        claim_key = dedupe_key(
+            "demo", demo_request.email.lower(), demo_request.whatsapp, demo_request.name,
+            demo_request.company, demo_request.preferred_datetime.isoformat(), demo_request.timezone,
+        )
+        claimed, previous = await claim_submission(claim_key)
+        if not claimed:
+            return previous or {
+                "success": True,
+                "message": demo_message,
+                "demo_scheduled": demo_local
+            }
+        claimed_key = claim_key
         
         # For now, we'll simulate calendar integration
         # In production, this would integrate with Google Calendar OAuth
@@ -208,19 +265,19 @@ async def schedule_demo(
             company=demo_request.company,
             action_type="demo",
             utm_data=demo_request.utm.dict() if demo_request.utm else {},
-            demo_scheduled=demo_request.preferred_datetime,
+            demo_scheduled=to_utc_naive(demo_local),
             calendar_event_id=calendar_event_id
         )
         
-        # Save to database
-        await db.leads.insert_one(lead_record.dict())
+        # Save to database, merging into an existing lead if any
+        stored_lead, _ = await services.lead_store.upsert(lead_record)
         
         # Send analytics event
-        await kavvi_api.send_analytics_event({
+        await services.kavvi_api.send_analytics_event({
             "event": "demo_scheduled",
             "properties": {
                 "page": "whatsapp-lead-generation",
-                "demo_datetime": demo_request.preferred_datetime.isoformat(),
+                "demo_datetime": demo_local.isoformat(),
                 "email": demo_request.email,
                 "utm_source": demo_request.utm.utm_source if demo_request.utm else None,
                 "user_agent": user_agent,
@@ -228,37 +285,73 @@ async def schedule_demo(
             }
         })
         
-        return {
+        response = {
             "success": True,
-            "message": f"Demo agendado para {demo_request.preferred_datetime.strftime('%d/%m/%Y às %H:%M')}",
-            "demo_scheduled": demo_request.preferred_datetime,
-            "calendar_event_id": calendar_event_id
+            "message": demo_message,
+            "demo_scheduled": demo_local,
+            "calendar_event_id": calendar_event_id,
+            "lead_id": stored_lead.id if stored_lead else None
         }
+        await store_response(claim_key, response)
+        return response
         
     except HTTPException:
+        if claimed_key:
+            await services.shared_state.release(claimed_key)
         raise
     except Exception as e:
-        logger.error(f"Demo scheduling error: {e}")
+        if claimed_key:
+            await services.shared_state.release(claimed_key)
+        logger.error("Demo scheduling error: %s", e)
         raise HTTPException(
             status_code=500,
             detail=get_error_message('server_error')
         )
 
+@router.get("/demo/slots")
+async def get_demo_slots(days: int = 7, timezone: str = BUSINESS_TIMEZONE):
+    """List bookable demo slots for the next `days` days in the visitor's timezone"""
+    if get_zone(timezone) is None:
+        raise HTTPException(status_code=400, detail=get_error_message('invalid_timezone'))
+
+    slots = generate_slots(max(1, min(days, 30)), timezone)
+    return {
+        "timezone": timezone,
+        "slot_minutes": SLOT_MINUTES,
+        "slots": [slot.isoformat() for slot in slots]
+    }
+
+@router.get("/leads/{lead_id}", response_model=LeadStatusResponse)
+async def get_lead_status(lead_id: str):
+    """Trial/demo status for confirmation pages and follow-up links"""
+    lead = await services.lead_store.get(lead_id)
+    if not lead:
+        raise HTTPException(status_code=404, detail=get_error_message('lead_not_found'))
+
+    return LeadStatusResponse(
+        lead_id=lead.id,
+        action_type=lead.action_type,
+        status=lead.status,
+        created_at=lead.created_at,
+        trial_expires=lead.trial_expires,
+        demo_scheduled=lead.demo_scheduled
+    )
+
 @router.get("/health")
 async def health_check():
     """Health check for landing page services"""
     try:
         # Test database connection
-        await db.command("ping")
+        await services.db.command("ping")
         
         return {
             "status": "healthy",
             "services": {
                 "database": "connected",
-                "external_api": "configured" if kavvi_api.submit_secret else "not_configured"
+                "external_api": "configured" if services.kavvi_api.submit_secret else "not_configured"
             },
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
+        logger.error("Health check failed: %s", e)
         raise HTTPException(status_code=503, detail="Service unhealthy")
\ No newline at end of file
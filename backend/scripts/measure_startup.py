@@ -0,0 +1,61 @@
+"""
+Measure worker cold start: time to import `server` and time until a freshly
+started uvicorn process answers its first /api/health/live request.
+
+Usage: python -m backend.scripts.measure_startup [--runs 5] [--port 8765]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+
+
+def measure_import() -> float:
+    """Seconds spent importing server.py in a fresh interpreter"""
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, text=True)
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_request(port: int, timeout: float = 30.0) -> float:
+    """Seconds from process spawn until the liveness endpoint answers"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/api/health/live"
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"No response from {url} after {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(label: str, values):
+    values_ms = [value * 1000 for value in values]
+    print(f"{label}: median {statistics.median(values_ms):.1f} ms, "
+          f"min {min(values_ms):.1f} ms, max {max(values_ms):.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time and time-to-first-request")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the temporary uvicorn process")
+    args = parser.parse_args()
+
+    report("import server", [measure_import() for _ in range(args.runs)])
+    report("time to first request", [measure_first_request(args.port) for _ in range(args.runs)])
@@ -0,0 +1,91 @@
+"""
+One-off job rewriting legacy lead documents (full-length keys, UUID string
+`id`, null UTM fields) into the compact LeadCodec format. Duplicates sharing
+a normalized email or WhatsApp are merged into a single lead on the way.
+Safe to re-run after a crash: touchpoints remember the legacy document they
+came from, so a document merged but not yet deleted is only deleted.
+
+Usage: python -m backend.scripts.migrate_leads [--batch-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from ..services.lead_codec import MIGRATED_FROM_KEY, lead_codec
+from ..services.lead_store import LeadStore, build_touchpoint
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate(collection, batch_size: int, dry_run: bool):
+    """Migrate legacy leads oldest first so merged leads keep the original creation date"""
+    lead_store = LeadStore(collection)
+    migrated_from = f"{lead_codec.key('attribution_history')}.{MIGRATED_FROM_KEY}"
+    if not dry_run:
+        await lead_store.ensure_indexes()
+        await collection.create_index(migrated_from, sparse=True, name="migrated_from")
+
+    migrated = 0
+    merged = 0
+    skipped = 0
+    legacy_filter = {"email": {"$exists": True}}
+
+    while True:
+        batch = await collection.find(legacy_filter).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        for document in batch:
+            lead_record = lead_codec.decode(document)
+            if dry_run:
+                migrated += 1
+                continue
+
+            legacy_id = document["_id"]
+            # A previous run may have merged this document and stopped before deleting it
+            if await collection.find_one({migrated_from: legacy_id}, projection={"_id": 1}) is None:
+                touchpoints = lead_record.attribution_history or [build_touchpoint(lead_record)]
+                lead_record.attribution_history = [{**entry, MIGRATED_FROM_KEY: legacy_id} for entry in touchpoints]
+                _, created = await lead_store.upsert(lead_record)
+                migrated += 1
+                merged += 0 if created else 1
+            else:
+                skipped += 1
+            await collection.delete_one({"_id": legacy_id})
+
+        if dry_run:
+            break
+        logger.info("Migrated %s leads (%s merged into existing leads)", migrated, merged)
+
+    total = await collection.count_documents(legacy_filter)
+    logger.info(
+        "Migration finished: %s processed, %s merged, %s already merged by an earlier run, %s legacy documents remaining",
+        migrated, merged, skipped, total,
+    )
+
+
+async def run(batch_size: int, dry_run: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        await migrate(client[os.environ['DB_NAME']].leads, batch_size, dry_run)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Migrate leads to the compact storage format")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Decode the first batch without writing")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.batch_size, args.dry_run))
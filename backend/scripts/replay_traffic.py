@@ -0,0 +1,318 @@
+"""
+Replay a traffic capture (written by TrafficCaptureMiddleware) against a local
+copy of the API and report latency percentiles, error rates and upstream
+KAVVI calls per endpoint.
+
+The app runs in this process on a random port, backed by an in-memory Mongo
+stand-in (mongomock-motor) or a scratch database on --mongo-url, and talks
+to a fake KAVVI API served from this process as well. Requests are sent at
+their captured offsets divided by --speed (0 = as fast as --max-in-flight
+allows). Client and server share the event loop, so latencies include some
+client overhead at high rates - compare runs with each other, not with
+production numbers.
+
+Usage: python -m backend.scripts.replay_traffic capture.jsonl [--speed 1] [--max-in-flight 200]
+           [--upstream-latency-ms 80] [--upstream-error-rate 0] [--mongo-url mongodb://...] [--json report.json]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import socket
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.captured_latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0  # Connection errors and timeouts
+        self.upstream: Counter = Counter()
+
+    def summary(self) -> Dict[str, Any]:
+        count = len(self.latencies) + self.errors
+        server_errors = sum(n for status, n in self.statuses.items() if status >= 500)
+        return {
+            "count": count,
+            "status": {str(status): n for status, n in sorted(self.statuses.items())},
+            "error_rate": round((server_errors + self.errors) / count, 4) if count else 0.0,
+            "latency_ms": percentiles(self.latencies),
+            "captured_latency_ms": percentiles(self.captured_latencies),
+            "upstream_calls": dict(self.upstream),
+        }
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p90/p99/max in milliseconds"""
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(p * len(ordered) + 0.5) - 1))], 2)
+
+    return {"p50": rank(0.50), "p90": rank(0.90), "p99": rank(0.99), "max": round(ordered[-1], 2)}
+
+
+def read_capture(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as capture_file:
+        for line in capture_file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def shift_demo_datetime(body: Any, offset: timedelta) -> Any:
+    """Move a captured demo slot forward so it is still in the future at replay time"""
+    if isinstance(body, dict) and isinstance(body.get("preferred_datetime"), str):
+        try:
+            preferred = datetime.fromisoformat(body["preferred_datetime"].replace("Z", "+00:00"))
+        except ValueError:
+            return body
+        body = dict(body, preferred_datetime=(preferred + offset).isoformat())
+    return body
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def start_fake_kavvi(stats: Dict[str, EndpointStats], request_endpoints: Dict[str, str],
+                           latency_ms: float, error_rate: float):
+    """Local stand-in for the KAVVI API counting calls per originating endpoint"""
+    from aiohttp import web
+
+    def count(request: web.Request, upstream: str):
+        endpoint = request_endpoints.get(request.headers.get("X-Request-ID", ""), "(no request)")
+        stats[endpoint].upstream[upstream] += 1
+
+    async def respond(upstream: str, request: web.Request, payload: Dict[str, Any]) -> web.Response:
+        count(request, upstream)
+        await request.read()
+        if latency_ms:
+            await asyncio.sleep(random.expovariate(1 / latency_ms) / 1000)
+        if random.random() < error_rate:
+            return web.json_response({"error": "simulated failure"}, status=500)
+        return web.json_response(payload)
+
+    async def submit(request: web.Request) -> web.Response:
+        return await respond("landings/submit", request, {"id": uuid.uuid4().hex})
+
+    async def ingest(request: web.Request) -> web.Response:
+        return await respond("events/ingest", request, {"accepted": True})
+
+    async def ingest_batch(request: web.Request) -> web.Response:
+        return await respond("events/batch", request, {"accepted": True})
+
+    app = web.Application()
+    app.router.add_post("/landings/submit", submit)
+    app.router.add_post("/events/ingest", ingest)
+    app.router.add_post("/events/batch", ingest_batch)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def open_database(mongo_url: Optional[str]):
+    """In-memory stand-in by default, or a scratch database on a real server"""
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(mongo_url)
+        db = client[f"kavvi_replay_{int(time.time())}"]
+
+        async def cleanup():
+            await client.drop_database(db.name)
+            client.close()
+        return db, cleanup
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; install it or pass --mongo-url")
+
+    async def noop():
+        pass
+    return AsyncMongoMockClient()["kavvi_replay"], noop
+
+
+async def replay(args) -> Dict[str, Any]:
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    request_endpoints: Dict[str, str] = {}
+
+    kavvi_runner, kavvi_url = await start_fake_kavvi(stats, request_endpoints, args.upstream_latency_ms, args.upstream_error_rate)
+
+    # Must be set before the app is imported: services read env at startup, .env doesn't override
+    os.environ.update({
+        "KAVVI_API_BASE_URL": kavvi_url,
+        "EVENTS_INGEST_URL": f"{kavvi_url}/events/ingest",
+        "EVENTS_BATCH_INGEST_URL": f"{kavvi_url}/events/batch",
+        "SHARED_STATE_URL": "",
+        "LEAD_WEBHOOK_URLS": "",
+        "TRAFFIC_CAPTURE_PATH": "",
+        "LOG_LEVEL": args.log_level,
+    })
+    from .. import server
+    import uvicorn
+    import aiohttp
+
+    db, cleanup_db = await open_database(args.mongo_url)
+    await server.services.startup(db=db)
+
+    port = free_port()
+    app_server = uvicorn.Server(uvicorn.Config(
+        server.app, host="127.0.0.1", port=port, lifespan="off", log_config=None, access_log=False,
+    ))
+    serve_task = asyncio.create_task(app_server.serve())
+    while not app_server.started:
+        await asyncio.sleep(0.01)
+
+    base_url = f"http://127.0.0.1:{port}"
+    semaphore = asyncio.Semaphore(args.max_in_flight)
+    in_flight = set()
+    skipped = 0
+    lag = 0.0
+
+    async def send(session: aiohttp.ClientSession, entry: Dict[str, Any], body: bytes, headers: Dict[str, str]):
+        endpoint = f"{entry['method']} {entry['path']}"
+        endpoint_stats = stats[endpoint]
+        if entry.get("duration_ms") is not None:
+            endpoint_stats.captured_latencies.append(entry["duration_ms"])
+
+        url = base_url + entry["path"] + (f"?{entry['query']}" if entry.get("query") else "")
+        started = time.perf_counter()
+        try:
+            async with session.request(entry["method"], url, data=body, headers=headers) as response:
+                await response.read()
+                endpoint_stats.statuses[response.status] += 1
+            endpoint_stats.latencies.append((time.perf_counter() - started) * 1000)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            endpoint_stats.errors += 1
+        finally:
+            semaphore.release()
+
+    started_at = time.monotonic()
+    first_ts = None
+    demo_offset = None
+
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(limit=0)) as session:
+        for count, entry in enumerate(read_capture(Path(args.capture))):
+            if args.limit and count >= args.limit:
+                break
+            if "body" not in entry:
+                skipped += 1  # Body was too large to capture
+                continue
+
+            if first_ts is None:
+                first_ts = entry["ts"]
+                # Whole weeks keep weekday and time of day, so slots stay within business hours
+                weeks = (datetime.utcnow() - datetime.utcfromtimestamp(first_ts)).days // 7 + 1
+                demo_offset = timedelta(weeks=weeks)
+
+            if args.speed > 0:
+                delay = started_at + (entry["ts"] - first_ts) / args.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    lag = max(lag, -delay)
+
+            body_value = entry["body"]
+            if entry["path"].endswith("/demo/schedule"):
+                body_value = shift_demo_datetime(body_value, demo_offset)
+            if body_value is None:
+                body = b""
+            elif isinstance(body_value, str):
+                body = body_value.encode("utf-8")
+            else:
+                body = json.dumps(body_value).encode("utf-8")
+
+            request_id = uuid.uuid4().hex
+            request_endpoints[request_id] = f"{entry['method']} {entry['path']}"
+            headers = dict(entry.get("headers", {}))
+            headers["X-Request-ID"] = request_id
+            if entry.get("client_ip"):
+                headers["X-Forwarded-For"] = entry["client_ip"]
+            if entry.get("gzip"):
+                body = gzip.compress(body)
+                headers["Content-Encoding"] = "gzip"
+
+            await semaphore.acquire()
+            task = asyncio.create_task(send(session, entry, body, headers))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        await asyncio.gather(*in_flight)
+        elapsed = time.monotonic() - started_at
+        await asyncio.sleep(1)  # Let background tasks (analytics batches) reach the fake upstream
+
+    app_server.should_exit = True
+    await serve_task
+    await server.services.shutdown()
+    await cleanup_db()
+    await kavvi_runner.cleanup()
+
+    total = sum(len(s.latencies) + s.errors for s in stats.values())
+    return {
+        "capture": args.capture,
+        "speed": args.speed,
+        "requests": total,
+        "skipped": skipped,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 2) if elapsed else None,
+        "max_schedule_lag_ms": round(lag * 1000, 2),
+        "endpoints": {endpoint: s.summary() for endpoint, s in sorted(stats.items())},
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['requests_per_second']} req/s, speed x{report['speed']}, "
+          f"max schedule lag {report['max_schedule_lag_ms']} ms, {report['skipped']} skipped)")
+    print()
+    print(f"{'endpoint':<36} {'count':>6} {'err%':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'prod p50':>9}  upstream")
+    for endpoint, summary in report["endpoints"].items():
+        latency = summary["latency_ms"]
+        upstream = " ".join(f"{path}={n}" for path, n in sorted(summary["upstream_calls"].items()))
+
+        def fmt(value):
+            return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+        print(f"{endpoint:<36} {summary['count']:>6} {summary['error_rate'] * 100:>5.1f}% "
+              f"{fmt(latency['p50'])} {fmt(latency['p90'])} {fmt(latency['p99'])} {fmt(latency['max'])} "
+              f"{fmt(summary['captured_latency_ms']['p50']):>9}  {upstream}")
+        statuses = ", ".join(f"{status}: {n}" for status, n in summary["status"].items())
+        if statuses:
+            print(f"{'':<36} {statuses}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured traffic against a local copy of the API")
+    parser.add_argument("capture", help="JSONL file written by TrafficCaptureMiddleware")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale (2 = twice as fast, 0 = no delays)")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Cap on concurrent requests")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N entries")
+    parser.add_argument("--upstream-latency-ms", type=float, default=80.0, help="Mean fake KAVVI latency")
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0, help="Fraction of fake KAVVI calls failing with 500")
+    parser.add_argument("--mongo-url", help="Use a scratch database on this server instead of the in-memory stand-in")
+    parser.add_argument("--log-level", default="WARNING", help="App log level during the replay")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args))
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
@@ -0,0 +1,63 @@
+"""
+Local fake webhook receiver for lead events. Verifies signatures, drops
+repeated event IDs and prints what arrives; --fail-rate makes it answer 503
+at random to exercise retries.
+
+Usage: python -m backend.scripts.webhook_receiver [--port 8787] [--secret ...] [--fail-rate 0.2]
+Then point LEAD_WEBHOOK_URLS at http://localhost:8787/webhooks/leads
+"""
+import argparse
+import hmac
+import json
+import random
+
+from aiohttp import web
+
+from ..services.lead_events import sign_payload
+
+
+def create_app(secret: str = "", fail_rate: float = 0.0) -> web.Application:
+    seen = set()
+    stats = {"batches": 0, "events": 0, "duplicates": 0, "rejected": 0}
+
+    async def receive(request: web.Request) -> web.Response:
+        body = await request.read()
+
+        if secret:
+            expected = sign_payload(secret, request.headers.get("X-Kavvi-Timestamp", ""), body)
+            if not hmac.compare_digest(expected, request.headers.get("X-Kavvi-Signature", "")):
+                stats["rejected"] += 1
+                return web.json_response({"error": "invalid signature"}, status=401)
+
+        if random.random() < fail_rate:
+            return web.json_response({"error": "simulated failure"}, status=503)
+
+        stats["batches"] += 1
+        for event in json.loads(body)["events"]:
+            if event["id"] in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(event["id"])
+            stats["events"] += 1
+            lead = event["lead"]
+            print(f"{request.headers.get('X-Kavvi-Delivery')} {event['type']} {lead['id']} {lead['email']} ({lead['action_type']})")
+
+        return web.json_response({"received": True})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/webhooks/leads", receive)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake receiver for lead webhooks")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--secret", default="", help="LEAD_WEBHOOK_SECRET to verify signatures with")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of deliveries answered with 503")
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.secret, args.fail_rate), port=args.port)
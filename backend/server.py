@@ -1,29 +1,54 @@
-from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
+from pathlib import Path
+import sys
+
+# Load env before importing modules that read it
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Modules are imported as the `backend` package (they use relative imports);
+# make that work for `uvicorn server:app` run from backend/ too
+if not __package__:
+    sys.path.insert(0, str(ROOT_DIR.parent))
+
+# Queue-based, structured logging - configured before anything logs
+from backend.utils.log_config import configure_logging, RequestIdMiddleware
+configure_logging()
+
+from fastapi import FastAPI, APIRouter, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
 import logging
-from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
 import uuid
 from datetime import datetime
 
 # Import new routes
-from routes.landings import router as landings_router
-from routes.analytics import router as analytics_router
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+from backend.routes.landings import router as landings_router, get_client_ip
+from backend.routes.analytics import router as analytics_router
+from backend.routes.admin import router as admin_router
+from backend.middleware.spam_filter import SpamFilterMiddleware
+from backend.middleware.profiling import ProfilingMiddleware
+from backend.middleware.admission import AdmissionControlMiddleware
+from backend.middleware.compression import CompressionMiddleware, GzipRequestMiddleware
+from backend.middleware.capture import TrafficCaptureMiddleware
+from backend.services.spam_filter import spam_filter
+from backend.services.lifecycle import services
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Mongo client and outbound services are created here, not at import
+    await services.startup()
+    yield
+    await services.shutdown()
 
 # Create the main app without a prefix
-app = FastAPI(title="KAVVI CRM Landing API", version="1.0.0")
+app = FastAPI(title="KAVVI CRM Landing API", version="1.0.0", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -46,21 +71,57 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    _ = await services.db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+    status_checks = await services.db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
+@api_router.get("/health/live")
+async def liveness():
+    """Liveness probe - the process is up and serving, no I/O"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Readiness probe - services are started and the database answers"""
+    if not await services.check_ready():
+        return JSONResponse(status_code=503, content={"status": "not_ready"})
+    return {"status": "ready"}
+
 # Include new routers
 api_router.include_router(landings_router)
 api_router.include_router(analytics_router)
+api_router.include_router(admin_router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# gzip-encoded bodies on batch endpoints, decoded only for admitted requests
+app.add_middleware(GzipRequestMiddleware)
+
+# Shed load early with a fast 503 instead of queueing without bound
+app.add_middleware(AdmissionControlMiddleware)
+
+# Reject bot traffic before it reaches the database or the KAVVI API
+app.add_middleware(SpamFilterMiddleware)
+
+# Sanitized traffic capture for scripts/replay_traffic.py (TRAFFIC_CAPTURE_PATH), outside the
+# layers that reject requests so captures reflect offered load
+app.add_middleware(TrafficCaptureMiddleware)
+
+# Opt-in per-request profiling (covers everything below CORS)
+app.add_middleware(ProfilingMiddleware)
+
+# Request IDs for log correlation, bound before any other middleware logs
+app.add_middleware(RequestIdMiddleware)
+
+# Negotiated response compression (br/zstd when installed, gzip otherwise)
+app.add_middleware(CompressionMiddleware)
+
+# Added last so it is outermost and early rejections still carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -69,13 +130,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    # A filled honeypot field marks the IP so its next requests are cut off early
+    if any("website" in error.get("loc", ()) for error in exc.errors()):
+        spam_filter.penalize(get_client_ip(request), "honeypot")
+    return await request_validation_exception_handler(request, exc)
+
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
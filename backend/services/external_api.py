@@ -1,23 +1,38 @@
-import aiohttp
 import os
+import gzip
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
+from ..utils.log_config import request_id_var
+
 logger = logging.getLogger(__name__)
 
+def trace_headers() -> Dict[str, str]:
+    """Forward the current request ID so upstream calls can be correlated"""
+    request_id = request_id_var.get()
+    return {'X-Request-ID': request_id} if request_id else {}
+
 class KAVVIAPIService:
     def __init__(self):
-        self.base_url = "https://api.kavvicrm.com.br"
+        self.base_url = os.environ.get('KAVVI_API_BASE_URL', "https://api.kavvicrm.com.br").rstrip('/')
         self.submit_secret = os.environ.get('LANDINGS_SUBMIT_SECRET')
         self.events_ingest_url = os.environ.get('EVENTS_INGEST_URL', f"{self.base_url}/events/ingest")
+        # Batches go to their own endpoint: the ingest URL takes one event per request
+        self.events_batch_url = os.environ.get('EVENTS_BATCH_INGEST_URL', f"{self.base_url}/events/batch")
+        # Batches at least this large are sent gzip-encoded (0 disables)
+        self.events_gzip_min_bytes = int(os.environ.get('EVENTS_INGEST_GZIP_MIN_BYTES', '1024'))
     
     async def submit_lead(self, lead_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Submit lead to KAVVI API"""
+        import aiohttp  # Imported on first use to keep worker start-up fast
+
         try:
             headers = {
                 'Authorization': f'Bearer {self.submit_secret}',
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                **trace_headers()
             }
             
             # Format data according to KAVVI API spec
@@ -40,26 +55,29 @@ class KAVVIAPIService:
                 ) as response:
                     if response.status == 200:
                         result = await response.json()
-                        logger.info(f"Lead submitted successfully: {result}")
+                        logger.info("Lead submitted successfully: %s", result.get("id") if isinstance(result, dict) else None)
                         return result
                     else:
                         error_text = await response.text()
-                        logger.error(f"KAVVI API error {response.status}: {error_text}")
+                        logger.error("KAVVI API error %s: %s", response.status, error_text)
                         return None
                         
         except aiohttp.ClientError as e:
-            logger.error(f"Network error submitting lead: {e}")
+            logger.error("Network error submitting lead: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error submitting lead: {e}")
+            logger.error("Unexpected error submitting lead: %s", e)
             return None
     
     async def send_analytics_event(self, event_data: Dict[str, Any]) -> bool:
         """Send analytics event to KAVVI"""
         try:
+            import aiohttp
+
             headers = {
                 'Content-Type': 'application/json',
-                'X-Tenant': 'kavvi-site'
+                'X-Tenant': 'kavvi-site',
+                **trace_headers()
             }
             
             async with aiohttp.ClientSession() as session:
@@ -70,16 +88,50 @@ class KAVVIAPIService:
                     timeout=aiohttp.ClientTimeout(total=5)
                 ) as response:
                     if response.status in [200, 201, 202]:
-                        logger.info(f"Analytics event sent: {event_data.get('event')}")
+                        logger.debug("Analytics event sent: %s", event_data.get('event'))
                         return True
                     else:
-                        logger.warning(f"Analytics event failed {response.status}")
+                        logger.warning("Analytics event failed %s", response.status)
                         return False
                         
         except Exception as e:
-            logger.warning(f"Analytics event error: {e}")
+            logger.warning("Analytics event error: %s", e)
             return False  # Don't fail the main request for analytics
 
+    async def send_analytics_events(self, events: List[Dict[str, Any]]) -> bool:
+        """Send a batch of analytics events to KAVVI in a single request"""
+        try:
+            import aiohttp
+
+            headers = {
+                'Content-Type': 'application/json',
+                'X-Tenant': 'kavvi-site',
+                **trace_headers()
+            }
+            
+            body = json.dumps({"events": events}, default=str).encode("utf-8")
+            if self.events_gzip_min_bytes and len(body) >= self.events_gzip_min_bytes:
+                body = gzip.compress(body, compresslevel=6)
+                headers['Content-Encoding'] = 'gzip'
+            
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    self.events_batch_url,
+                    data=body,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=5)
+                ) as response:
+                    if response.status in [200, 201, 202]:
+                        logger.debug("Analytics batch sent: %s events", len(events))
+                        return True
+                    else:
+                        logger.warning("Analytics batch failed %s", response.status)
+                        return False
+                        
+        except Exception as e:
+            logger.warning("Analytics batch error: %s", e)
+            return False
+
 class GoogleCalendarService:
     def __init__(self):
         self.client_id = os.environ.get('GOOGLE_CLIENT_ID')
@@ -106,6 +158,8 @@ class GoogleCalendarService:
     async def exchange_code_for_token(self, code: str) -> Optional[Dict[str, Any]]:
         """Exchange authorization code for access token"""
         try:
+            import aiohttp
+
             token_url = "https://oauth2.googleapis.com/token"
             data = {
                 'client_id': self.client_id,
@@ -120,16 +174,18 @@ class GoogleCalendarService:
                     if response.status == 200:
                         return await response.json()
                     else:
-                        logger.error(f"Token exchange failed: {response.status}")
+                        logger.error("Token exchange failed: %s", response.status)
                         return None
                         
         except Exception as e:
-            logger.error(f"Token exchange error: {e}")
+            logger.error("Token exchange error: %s", e)
             return None
     
     async def create_calendar_event(self, access_token: str, event_details: Dict[str, Any]) -> Optional[str]:
         """Create calendar event and return event ID"""
         try:
+            import aiohttp
+
             headers = {
                 'Authorization': f'Bearer {access_token}',
                 'Content-Type': 'application/json'
@@ -183,17 +239,13 @@ Link do ticket: {event_details.get('ticket_link', 'A ser criado')}
                     if response.status == 200:
                         result = await response.json()
                         event_id = result.get('id')
-                        logger.info(f"Calendar event created: {event_id}")
+                        logger.info("Calendar event created: %s", event_id)
                         return event_id
                     else:
                         error_text = await response.text()
-                        logger.error(f"Calendar event creation failed: {error_text}")
+                        logger.error("Calendar event creation failed: %s", error_text)
                         return None
                         
         except Exception as e:
-            logger.error(f"Calendar event creation error: {e}")
+            logger.error("Calendar event creation error: %s", e)
             return None
-
-# Initialize services
-kavvi_api = KAVVIAPIService()
-google_calendar = GoogleCalendarService()
\ No newline at end of file
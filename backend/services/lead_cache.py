@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..models import LeadRecord
+
+logger = logging.getLogger(__name__)
+
+
+class LeadCache:
+    """
+    In-process LRU cache of recently written or read leads with a TTL.
+    Concurrent misses for the same lead share a single database read, and
+    unknown IDs are cached briefly so repeated lookups don't reach Mongo.
+
+    Each worker has its own cache: writes through LeadStore update it in
+    the writing worker, other workers see the change once the TTL expires.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or int(os.environ.get('LEAD_CACHE_SIZE', '5000'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.environ.get('LEAD_CACHE_TTL_SECONDS', '60'))
+        self.negative_ttl_seconds = min(self.ttl_seconds, 5.0)
+
+        # lead_id -> (expires_at, lead or None when not found)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[LeadRecord]]]" = OrderedDict()
+        # lead_id -> in-flight database read
+        self._loading: Dict[str, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, lead_id: str) -> Tuple[bool, Optional[LeadRecord]]:
+        """Cached lead without loading. Returns: (found_in_cache, lead)"""
+        entry = self._entries.get(lead_id)
+        if entry is None:
+            return False, None
+        if entry[0] <= time.monotonic():
+            del self._entries[lead_id]
+            return False, None
+        self._entries.move_to_end(lead_id)
+        return True, entry[1]
+
+    async def get_or_load(self, lead_id: str, loader: Callable[[], Awaitable[Optional[LeadRecord]]]) -> Optional[LeadRecord]:
+        """Cached lead, or the result of `loader` shared with concurrent callers"""
+        cached, lead = self.get(lead_id)
+        if cached:
+            self.hits += 1
+            return lead
+        self.misses += 1
+
+        task = self._loading.get(lead_id)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(loader())
+        self._loading[lead_id] = task
+        try:
+            # Shielded so a cancelled caller doesn't fail the other waiters
+            lead = await asyncio.shield(task)
+        finally:
+            still_current = self._loading.get(lead_id) is task
+            if still_current:
+                del self._loading[lead_id]
+
+        # An update while the read was in flight makes its result stale
+        if still_current:
+            self._store(lead_id, lead)
+        return lead
+
+    def put(self, lead: LeadRecord):
+        """Cache a lead that was just written"""
+        self._loading.pop(lead.id, None)
+        self._store(lead.id, lead)
+
+    def invalidate(self, lead_id: str):
+        """Drop a lead after an update that didn't return the new document"""
+        self._loading.pop(lead_id, None)
+        self._entries.pop(lead_id, None)
+
+    def _store(self, lead_id: str, lead: Optional[LeadRecord]):
+        ttl = self.ttl_seconds if lead is not None else self.negative_ttl_seconds
+        self._entries[lead_id] = (time.monotonic() + ttl, lead)
+        self._entries.move_to_end(lead_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,173 @@
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+from bson import Binary
+
+from ..models import LeadRecord
+
+# Short storage keys for LeadRecord fields
+FIELD_KEYS = {
+    "id": "_id",
+    "name": "n",
+    "email": "e",
+    "whatsapp": "w",
+    "company": "c",
+    "source": "s",
+    "action_type": "a",
+    "utm_data": "u",
+    "created_at": "t",
+    "updated_at": "ut",
+    "trial_expires": "te",
+    "demo_scheduled": "ds",
+    "calendar_event_id": "ce",
+    "external_lead_id": "x",
+    "status": "st",
+    "attribution_history": "h",
+}
+
+# Short storage keys for UTMData fields
+UTM_KEYS = {
+    "utm_source": "us",
+    "utm_medium": "um",
+    "utm_campaign": "uc",
+    "utm_term": "tm",
+    "utm_content": "uo",
+    "gclid": "gc",
+    "gbraid": "gb",
+    "wbraid": "wb",
+    "fbclid": "fb",
+    "msclkid": "ms",
+    "referrer": "rf",
+    "device": "dv",
+    "placement": "pl",
+    "dkinsertion": "dk",
+}
+
+# Repeated low-cardinality strings stored as small integers.
+# Only append to these lists - stored documents reference values by position.
+DICTIONARIES = {
+    "source": ["landing-whatsapp"],
+    "action_type": ["trial", "demo"],
+    "status": ["active", "inactive", "converted", "lost"],
+}
+
+# Touchpoint key recording the legacy document a migrated touchpoint came from
+MIGRATED_FROM_KEY = "mf"
+
+FIELD_NAMES = {short: name for name, short in FIELD_KEYS.items()}
+UTM_NAMES = {short: name for name, short in UTM_KEYS.items()}
+DICTIONARY_CODES = {field: {value: code for code, value in enumerate(values)} for field, values in DICTIONARIES.items()}
+
+
+class LeadCodec:
+    """
+    Compact storage encoding for LeadRecord documents: short keys, binary
+    UUID as _id, null fields dropped and optional dictionary encoding of
+    repeated strings. Decoding also accepts legacy full-length documents.
+    """
+
+    def __init__(self, dictionary_encode: Optional[bool] = None):
+        if dictionary_encode is None:
+            dictionary_encode = os.environ.get('LEAD_STORAGE_DICT_ENCODING', 'true').lower() == 'true'
+        self.dictionary_encode = dictionary_encode
+
+    def key(self, field: str) -> str:
+        """Storage key for a LeadRecord field"""
+        return FIELD_KEYS[field]
+
+    def encode_id(self, lead_id: str) -> Binary:
+        return Binary.from_uuid(uuid.UUID(lead_id))
+
+    def decode_id(self, value: Any) -> str:
+        if isinstance(value, Binary):
+            return str(value.as_uuid())
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(value)
+
+    def encode_value(self, field: str, value: Any) -> Any:
+        """Encode a single LeadRecord field value"""
+        if field == "id":
+            return self.encode_id(value)
+        if field == "utm_data":
+            return self.encode_utm(value)
+        if field == "attribution_history":
+            return [self.encode_touchpoint(entry) for entry in value or []]
+        if self.dictionary_encode and field in DICTIONARY_CODES:
+            return DICTIONARY_CODES[field].get(value, value)
+        return value
+
+    def decode_value(self, field: str, value: Any) -> Any:
+        """Decode a single stored field value"""
+        if field == "id":
+            return self.decode_id(value)
+        if field == "utm_data":
+            return self.decode_utm(value)
+        if field == "attribution_history":
+            return [self.decode_touchpoint(entry) for entry in value or []]
+        if field in DICTIONARIES and isinstance(value, int):
+            return DICTIONARIES[field][value]
+        return value
+
+    def encode_utm(self, utm_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Drop null UTM fields and shorten keys"""
+        return {UTM_KEYS.get(k, k): v for k, v in (utm_data or {}).items() if v is not None}
+
+    def decode_utm(self, utm_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {UTM_NAMES.get(k, k): v for k, v in (utm_data or {}).items()}
+
+    def encode_touchpoint(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        encoded = {}
+        for field, value in entry.items():
+            if value is None:
+                continue
+            if field == "utm":
+                encoded["u"] = self.encode_utm(value)
+            else:
+                encoded[FIELD_KEYS.get(field, field)] = self.encode_value(field, value)
+        return encoded
+
+    def decode_touchpoint(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        if "utm" in entry or "action_type" in entry:
+            return entry  # Legacy full-length entry
+        decoded = {}
+        for short, value in entry.items():
+            if short == "u":
+                decoded["utm"] = self.decode_utm(value)
+            else:
+                field = FIELD_NAMES.get(short, short)
+                decoded[field] = self.decode_value(field, value)
+        return decoded
+
+    def encode_fields(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Encode a mapping of LeadRecord fields, dropping nulls"""
+        return {
+            FIELD_KEYS.get(field, field): self.encode_value(field, value)
+            for field, value in fields.items()
+            if value is not None
+        }
+
+    def encode(self, lead_record: LeadRecord) -> Dict[str, Any]:
+        """Encode a LeadRecord into a compact storage document"""
+        return self.encode_fields(lead_record.dict())
+
+    def decode_fields(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Decode a stored document into LeadRecord fields"""
+        if "email" in document:
+            # Legacy document with full-length keys and a separate UUID string id
+            return {k: v for k, v in document.items() if k != "_id"}
+        return {
+            FIELD_NAMES.get(short, short): self.decode_value(FIELD_NAMES.get(short, short), value)
+            for short, value in document.items()
+        }
+
+    def decode(self, document: Dict[str, Any]) -> LeadRecord:
+        """Decode a stored document (compact or legacy) back into a LeadRecord"""
+        return LeadRecord(**self.decode_fields(document))
+
+    def is_legacy(self, document: Dict[str, Any]) -> bool:
+        return "email" in document
+
+
+lead_codec = LeadCodec()
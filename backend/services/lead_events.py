@@ -0,0 +1,414 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .lead_codec import MIGRATED_FROM_KEY, lead_codec
+
+logger = logging.getLogger(__name__)
+
+# Lead fields sent to webhook targets
+EVENT_FIELDS = {
+    "id", "name", "email", "whatsapp", "company", "source", "action_type",
+    "utm_data", "created_at", "trial_expires", "demo_scheduled",
+}
+
+# Capped collection written by LeadStore when change streams are unavailable
+INSERT_LOG_COLLECTION = "lead_insert_log"
+INSERT_LOG_SIZE_BYTES = 16 * 1024 * 1024
+
+# Batches some target gave up on, kept so the checkpoint can move past them
+DEAD_LETTER_COLLECTION = "lead_webhook_dead_letters"
+
+# Change stream errors that mean the stored resume token can't be used anymore
+RESUME_TOKEN_LOST_CODES = {260, 280, 286}
+
+# New leads only: re-inserts done by scripts/migrate_leads.py carry the legacy
+# _id on their touchpoints and never reach the insert log either
+CHANGE_STREAM_PIPELINE = [{"$match": {
+    "operationType": "insert",
+    f"fullDocument.{lead_codec.key('attribution_history')}.{MIGRATED_FROM_KEY}": {"$exists": False},
+}}]
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat() + ("Z" if value.tzinfo is None else "")
+    return str(value)
+
+
+def build_event(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a `lead.created` event from a stored lead document"""
+    lead = lead_codec.decode(document)
+    return {
+        "id": lead.id,  # Stable across redeliveries - receivers dedupe on it
+        "type": "lead.created",
+        "occurred_at": lead.created_at,
+        "lead": lead.dict(include=EVENT_FIELDS),
+    }
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """HMAC-SHA256 over `<timestamp>.<body>`"""
+    digest = hmac.new(secret.encode("utf-8"), timestamp.encode("utf-8") + b"." + body, hashlib.sha256)
+    return f"sha256={digest.hexdigest()}"
+
+
+class WebhookTarget:
+    """A receiver of lead events with its own concurrency limit"""
+
+    def __init__(self, url: str, secret: Optional[str] = None, max_concurrency: int = 4):
+        self.url = url
+        self.key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]  # Checkpoint field name
+        self.secret = secret
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_attempts = 5
+        self.delivered = 0
+        self.failed = 0
+
+    async def deliver(self, session, body: bytes, delivery_id: str) -> bool:
+        """POST a batch, retrying with exponential backoff on network errors, 408, 429 and 5xx"""
+        import aiohttp
+
+        async with self.semaphore:
+            for attempt in range(self.max_attempts):
+                timestamp = str(int(time.time()))
+                headers = {
+                    "Content-Type": "application/json",
+                    "X-Kavvi-Delivery": delivery_id,
+                    "X-Kavvi-Timestamp": timestamp,
+                }
+                if self.secret:
+                    headers["X-Kavvi-Signature"] = sign_payload(self.secret, timestamp, body)
+
+                try:
+                    async with session.post(self.url, data=body, headers=headers,
+                                            timeout=aiohttp.ClientTimeout(total=10)) as response:
+                        if 200 <= response.status < 300:
+                            self.delivered += 1
+                            return True
+                        if response.status < 500 and response.status not in (408, 429):
+                            logger.error("Webhook %s rejected delivery %s: %s", self.url, delivery_id, response.status)
+                            break
+                        logger.warning("Webhook %s returned %s (attempt %s)", self.url, response.status, attempt + 1)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning("Webhook %s unreachable (attempt %s): %s", self.url, attempt + 1, e)
+
+                if attempt + 1 < self.max_attempts:
+                    await asyncio.sleep(2 ** attempt)
+
+        self.failed += 1
+        logger.error("Giving up on webhook delivery %s to %s", delivery_id, self.url)
+        return False
+
+
+def load_webhook_targets() -> List[WebhookTarget]:
+    """Targets from LEAD_WEBHOOK_URLS (comma separated), signed with LEAD_WEBHOOK_SECRET"""
+    urls = [url.strip() for url in os.environ.get('LEAD_WEBHOOK_URLS', '').split(",") if url.strip()]
+    secret = os.environ.get('LEAD_WEBHOOK_SECRET') or None
+    max_concurrency = int(os.environ.get('LEAD_WEBHOOK_CONCURRENCY', '4'))
+    return [WebhookTarget(url, secret, max_concurrency) for url in urls]
+
+
+class LeadEventDispatcher:
+    """
+    Push new leads to webhook targets. Inserts are read from a Mongo change
+    stream, or from a capped insert log tailed with an await cursor when the
+    server is not a replica set. Each target reads, batches and checkpoints
+    on its own, so an unreachable target only holds back its own resume
+    token; a restart continues each target where it left off (at-least-once;
+    event IDs let receivers drop repeats). A batch a target still rejects
+    after its retries is stored as a dead letter before its checkpoint moves
+    past it.
+
+    Every worker runs a dispatcher but only the holder of a lease stored next
+    to the resume tokens delivers. The lease is renewed on a timer, not
+    between deliveries, since a target retrying can take longer than it.
+    """
+
+    def __init__(self, db, lead_store, targets: List[WebhookTarget], source: Optional[str] = None):
+        self.db = db
+        self.lead_store = lead_store
+        self.targets = targets
+        self.source = source or os.environ.get('LEAD_EVENTS_SOURCE', 'auto')  # auto, change_stream or insert_log
+        self.batch_size = int(os.environ.get('LEAD_WEBHOOK_BATCH_SIZE', '20'))
+        self.batch_wait = float(os.environ.get('LEAD_WEBHOOK_BATCH_WAIT_MS', '1000')) / 1000
+        self.lease_seconds = 60
+
+        self.state = db.lead_webhook_state
+        self.dead_letters = db[DEAD_LETTER_COLLECTION]
+        self.owner = uuid.uuid4().hex
+        self.is_leader = False
+        self.batches = 0
+        self.events = 0
+        self.dead_lettered = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "leader": self.is_leader,
+            "batches": self.batches,
+            "events": self.events,
+            "dead_lettered": self.dead_lettered,
+            "targets": [{"url": t.url, "delivered": t.delivered, "failed": t.failed} for t in self.targets],
+        }
+
+    async def run(self):
+        """Background task: pick a source, then deliver whenever this worker holds the lease"""
+        while True:
+            try:
+                await self._resolve_source()
+                break
+            except Exception as e:
+                logger.error("Lead webhook source setup failed: %s", e)
+                await asyncio.sleep(5)
+
+        while True:
+            try:
+                if await self._acquire_lease():
+                    self.is_leader = True
+                    logger.info("Lead webhook dispatcher started (%s, %s targets)", self.source, len(self.targets))
+                    await self._dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Lead webhook dispatcher failed: %s", e)
+            finally:
+                if self.is_leader:
+                    self.is_leader = False
+                    await self._release_lease()
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    async def _resolve_source(self):
+        if self.source == "auto":
+            try:
+                hello = await self.db.command("hello")
+                replicated = "setName" in hello or hello.get("msg") == "isdbgrid"
+            except Exception as e:
+                logger.warning("Could not detect replica set, using the insert log: %s", e)
+                replicated = False
+            self.source = "change_stream" if replicated else "insert_log"
+
+        if self.source == "insert_log":
+            from pymongo.errors import CollectionInvalid
+
+            try:
+                await self.db.create_collection(INSERT_LOG_COLLECTION, capped=True, size=INSERT_LOG_SIZE_BYTES)
+            except CollectionInvalid:
+                pass  # Created by another worker
+            # Every worker writes the log, only the leader reads it
+            self.lead_store.insert_log = self.db[INSERT_LOG_COLLECTION]
+
+    # Lease and checkpoint
+
+    async def _acquire_lease(self) -> bool:
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.utcnow()
+        try:
+            await self.state.update_one(
+                {"_id": "leads", "$or": [
+                    {"owner": self.owner},
+                    {"lease_until": {"$lt": now}},
+                    {"lease_until": {"$exists": False}},
+                ]},
+                {"$set": {"owner": self.owner, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # Another worker holds the lease
+
+    async def _release_lease(self):
+        try:
+            await self.state.update_one({"_id": "leads", "owner": self.owner}, {"$set": {"lease_until": datetime.utcnow()}})
+        except Exception as e:
+            logger.warning("Could not release lead webhook lease: %s", e)
+
+    async def _renew_lease(self) -> bool:
+        """Extend the lease. False if another worker took it over."""
+        result = await self.state.update_one(
+            {"_id": "leads", "owner": self.owner},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    async def _keep_lease(self):
+        """Renew the lease every third of its duration, returning once it was lost"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self._renew_lease():
+                logger.warning("Lead webhook lease lost, stopping delivery")
+                return
+
+    def _load_token(self, state: Dict[str, Any], target: WebhookTarget) -> Optional[Any]:
+        checkpoint = (state.get("targets") or {}).get(target.key)
+        if checkpoint is None:
+            checkpoint = state  # Shared token saved before targets were checkpointed separately
+        if checkpoint.get("source") == self.source:
+            return checkpoint.get("token")
+        return None
+
+    async def _save_checkpoint(self, target: WebhookTarget, token: Any) -> bool:
+        """Persist a target's resume token. False if the lease was lost."""
+        result = await self.state.update_one(
+            {"_id": "leads", "owner": self.owner},
+            {"$set": {f"targets.{target.key}": {"url": target.url, "token": token, "source": self.source}}},
+        )
+        return result.matched_count == 1
+
+    # Sources
+
+    async def _read_change_stream(self, queue: asyncio.Queue, token: Optional[Any]):
+        from pymongo.errors import OperationFailure
+
+        try:
+            async with self.lead_store.collection.watch(CHANGE_STREAM_PIPELINE, resume_after=token) as stream:
+                async for change in stream:
+                    await queue.put((change["_id"], change["fullDocument"]))
+        except OperationFailure as e:
+            if token is None or e.code not in RESUME_TOKEN_LOST_CODES:
+                raise
+            # Token fell off the oplog - continue from now rather than stall
+            logger.error("Lead change stream resume token expired, events may have been missed: %s", e)
+            await self._read_change_stream(queue, None)
+
+    async def _read_insert_log(self, queue: asyncio.Queue, token: Optional[Any]):
+        from pymongo import CursorType
+
+        # Entries are read in $natural (server insertion) order and the position
+        # is the _id of the last entry read, matched by equality: ObjectIds are
+        # generated by each worker's client, so comparing them can skip entries
+        log = self.db[INSERT_LOG_COLLECTION]
+        position = token
+        if position is None:
+            # No checkpoint yet - start after the newest entry instead of replaying the log
+            newest = await log.find_one(sort=[("$natural", -1)])
+            position = newest["_id"] if newest else None
+
+        while True:
+            if position is not None and await log.find_one({"_id": position}) is None:
+                logger.error("Lead insert log position was overwritten, replaying the whole log")
+                position = None
+
+            cursor = log.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            skipping = position is not None
+            async for entry in cursor:
+                if skipping:
+                    skipping = entry["_id"] != position
+                    continue
+                position = entry["_id"]
+                await queue.put((entry["_id"], entry["d"]))
+            # Cursor dies when the log is empty or was overrun - reopen it
+            await asyncio.sleep(1)
+
+    # Delivery
+
+    async def _dispatch(self):
+        """Deliver to every target until the lease is lost"""
+        import aiohttp
+
+        state = await self.state.find_one({"_id": "leads"}) or {}
+        async with aiohttp.ClientSession() as session:
+            tasks = [asyncio.create_task(self._keep_lease())]
+            tasks += [
+                asyncio.create_task(self._dispatch_target(session, target, self._load_token(state, target)))
+                for target in self.targets
+            ]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()  # Propagate a reader or dead-letter error
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _dispatch_target(self, session, target: WebhookTarget, token: Optional[Any]):
+        """Read, batch and deliver events to one target until its checkpoint can't be saved"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.batch_size * target.max_concurrency)
+        read = self._read_change_stream if self.source == "change_stream" else self._read_insert_log
+        reader = asyncio.create_task(read(queue, token))
+        in_flight: Deque[Tuple[Any, asyncio.Task]] = deque()
+
+        try:
+            while True:
+                batch, batch_token = await self._next_batch(queue, reader)
+
+                if batch_token is not None:
+                    in_flight.append((batch_token, asyncio.create_task(self._deliver(session, target, batch))))
+
+                # Checkpoint in order: only batches whose predecessors are done
+                if len(in_flight) >= target.max_concurrency:
+                    await asyncio.wait([in_flight[0][1]])
+                checkpoint = None
+                while in_flight and in_flight[0][1].done():
+                    batch_token, delivery = in_flight.popleft()
+                    delivery.result()  # Raises if a failed batch couldn't be dead-lettered
+                    checkpoint = batch_token
+
+                if checkpoint is not None and not await self._save_checkpoint(target, checkpoint):
+                    logger.warning("Lead webhook lease lost, stopping delivery to %s", target.url)
+                    return
+        finally:
+            reader.cancel()
+            for _, delivery in in_flight:
+                delivery.cancel()
+            await asyncio.gather(reader, *(delivery for _, delivery in in_flight), return_exceptions=True)
+
+    async def _next_batch(self, queue: asyncio.Queue, reader: asyncio.Task) -> Tuple[List[Dict[str, Any]], Any]:
+        """Collect up to batch_size events, waiting at most batch_wait after the first"""
+        batch, token = [], None
+        deadline = time.monotonic() + self.batch_wait
+
+        while len(batch) < self.batch_size:
+            if reader.done():
+                reader.result()  # Propagate the reader's error
+                break
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                token, document = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            try:
+                batch.append(build_event(document))
+            except Exception as e:
+                logger.error("Skipping undecodable lead event %s: %s", token, e)
+
+        return batch, token
+
+    async def _deliver(self, session, target: WebhookTarget, batch: List[Dict[str, Any]]) -> bool:
+        """
+        Send a batch to a target. Returns True if it was accepted, False if it
+        was dead-lettered. Raises when the dead letter can't be stored, so the
+        target's checkpoint stays before the batch.
+        """
+        if not batch:
+            return True  # Every event in the batch was skipped, only the token advances
+        self.batches += 1
+        self.events += len(batch)
+        body = json.dumps({"events": batch}, default=json_default).encode("utf-8")
+        delivery_id = uuid.uuid4().hex
+        if await target.deliver(session, body, delivery_id):
+            return True
+
+        await self.dead_letters.insert_one({
+            "_id": delivery_id,
+            "target": target.url,
+            "event_ids": [event["id"] for event in batch],
+            "body": body.decode("utf-8"),
+            "failed_at": datetime.utcnow(),
+        })
+        self.dead_lettered += 1
+        logger.error("Dead-lettered lead webhook delivery %s for %s", delivery_id, target.url)
+        return False
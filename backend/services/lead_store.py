@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple, TYPE_CHECKING
+import logging
+from ..models import LeadRecord
+from ..utils.validators import normalize_email
+from .lead_codec import LeadCodec, lead_codec
+from .lead_cache import LeadCache
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorCollection
+
+logger = logging.getLogger(__name__)
+
+# Fields refreshed on an existing lead when the same person submits again
+MERGE_FIELDS = ["name", "company", "action_type", "trial_expires", "demo_scheduled", "calendar_event_id"]
+
+# Kept on a lead matched by WhatsApp under another email; the submitted
+# values go into the touchpoint instead
+WHATSAPP_MERGE_KEEP = ["name", "company", "action_type"]
+WHATSAPP_MERGE_TOUCHPOINT_FIELDS = ["email", "name", "company"]
+
+
+def build_touchpoint(lead_record: LeadRecord) -> Dict[str, Any]:
+    """Build an attribution history entry from a lead submission"""
+    return {
+        "action_type": lead_record.action_type,
+        "source": lead_record.source,
+        "utm": {k: v for k, v in (lead_record.utm_data or {}).items() if v is not None},
+        "created_at": lead_record.created_at,
+    }
+
+
+class LeadStore:
+    """Lead persistence deduplicated on normalized email and E.164 WhatsApp"""
+
+    def __init__(self, db_collection: "AsyncIOMotorCollection", codec: LeadCodec = lead_codec, cache: Optional[LeadCache] = None):
+        self.collection = db_collection
+        self.codec = codec
+        # Recently written/read leads for status lookups
+        self.cache = cache or LeadCache()
+        # Capped collection recording inserts, set when change streams are unavailable
+        self.insert_log: Optional["AsyncIOMotorCollection"] = None
+
+    async def ensure_indexes(self):
+        """Create the unique indexes used for deduplication"""
+        from pymongo.errors import OperationFailure
+
+        email_key = self.codec.key("email")
+        whatsapp_key = self.codec.key("whatsapp")
+
+        try:
+            # Partial so legacy documents awaiting migration don't collide on null
+            await self.collection.create_index(
+                email_key, unique=True, name="e_unique",
+                partialFilterExpression={email_key: {"$exists": True}},
+            )
+            await self.collection.create_index(
+                whatsapp_key, unique=True, name="w_unique",
+                partialFilterExpression={whatsapp_key: {"$exists": True}},
+            )
+        except OperationFailure as e:
+            # Existing duplicates prevent the unique index - run scripts/migrate_leads.py
+            logger.error("Could not create lead indexes, run the migration job: %s", e)
+
+    async def find_existing(self, email: str, whatsapp: str) -> Optional[LeadRecord]:
+        """Find a lead matching either the email or the WhatsApp number"""
+        document = await self.collection.find_one({"$or": [
+            {self.codec.key("email"): normalize_email(email)},
+            {self.codec.key("whatsapp"): whatsapp},
+        ]})
+        return self.codec.decode(document) if document else None
+
+    async def get(self, lead_id: str) -> Optional[LeadRecord]:
+        """Lead by ID, served from the cache when possible"""
+        try:
+            encoded_id = self.codec.encode_id(lead_id)
+        except ValueError:
+            return None  # Not a UUID - can't be a lead
+
+        async def load() -> Optional[LeadRecord]:
+            document = await self.collection.find_one({"_id": encoded_id})
+            return self.codec.decode(document) if document else None
+
+        return await self.cache.get_or_load(lead_id, load)
+
+    async def update(self, lead_id: str, fields: Dict[str, Any]) -> Optional[LeadRecord]:
+        """Set fields on a lead (e.g. status or external_lead_id backfill) and refresh the cache"""
+        from pymongo import ReturnDocument
+
+        try:
+            encoded_id = self.codec.encode_id(lead_id)
+        except ValueError:
+            return None  # Not a UUID - can't be a lead
+
+        fields = dict(fields, updated_at=datetime.utcnow())
+        self.cache.invalidate(lead_id)
+        stored = await self.collection.find_one_and_update(
+            {"_id": encoded_id},
+            {"$set": self.codec.encode_fields(fields)},
+            return_document=ReturnDocument.AFTER,
+        )
+        if stored is None:
+            return None
+
+        lead = self.codec.decode(stored)
+        self.cache.put(lead)
+        return lead
+
+    async def upsert(self, lead_record: LeadRecord) -> Tuple[Optional[LeadRecord], bool]:
+        """
+        Insert a lead or merge it into the existing one.
+        Returns: (stored_lead, created)
+        """
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+
+        lead_record.email = normalize_email(lead_record.email)
+        document = lead_record.dict()
+        touchpoints = document.pop("attribution_history") or [build_touchpoint(lead_record)]
+
+        merge = {field: document[field] for field in MERGE_FIELDS if document.get(field) is not None}
+        merge["updated_at"] = datetime.utcnow()
+        if document.get("external_lead_id"):
+            merge["external_lead_id"] = document["external_lead_id"]
+
+        insert_only = {k: v for k, v in document.items() if k not in merge}
+
+        update = {
+            "$set": self.codec.encode_fields(merge),
+            "$setOnInsert": self.codec.encode_fields(insert_only),
+            "$push": {self.codec.key("attribution_history"): {
+                "$each": [self.codec.encode_touchpoint(entry) for entry in touchpoints]
+            }},
+        }
+
+        try:
+            stored = await self.collection.find_one_and_update(
+                {self.codec.key("email"): lead_record.email},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Email is new but the WhatsApp number belongs to an existing lead:
+            # keep its identity and record what was submitted in the touchpoint
+            submitted = {field: document[field] for field in WHATSAPP_MERGE_TOUCHPOINT_FIELDS if document.get(field)}
+            update = {
+                "$set": self.codec.encode_fields({k: v for k, v in merge.items() if k not in WHATSAPP_MERGE_KEEP}),
+                "$push": {self.codec.key("attribution_history"): {
+                    "$each": [self.codec.encode_touchpoint({**entry, **submitted}) for entry in touchpoints]
+                }},
+            }
+            stored = await self.collection.find_one_and_update(
+                {self.codec.key("whatsapp"): lead_record.whatsapp},
+                update,
+                return_document=ReturnDocument.AFTER,
+            )
+
+        if stored is None:
+            return None, False
+
+        stored_lead = self.codec.decode(stored)
+        self.cache.put(stored_lead)
+        created = stored_lead.id == lead_record.id
+        if created and self.insert_log is not None:
+            await self._log_insert(stored)
+        return stored_lead, created
+
+    async def _log_insert(self, document: Dict[str, Any]):
+        """Record a new lead for the webhook dispatcher - never fails the submission"""
+        try:
+            await self.insert_log.insert_one({"d": document})
+        except Exception as e:
+            logger.error("Could not record lead %s in the insert log: %s", document.get("_id"), e)
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import logging
+from typing import Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Process-wide services, created in the application lifespan instead of at
+    import time so workers import fast and env is read after .env is loaded.
+    """
+
+    def __init__(self):
+        self.client = None
+        self.db = None
+        self.kavvi_api = None
+        self.google_calendar = None
+        self.rate_limiter = None
+        self.lead_store = None
+        self.shared_state = None
+        self.lead_events = None
+        self.started = False
+        self._background_tasks = []
+
+    async def startup(self, db: Optional[Any] = None):
+        """Create clients and services. `db` overrides the Mongo database (used by tools)."""
+        from .external_api import KAVVIAPIService, GoogleCalendarService
+        from .rate_limiter import RateLimiter
+        from .lead_store import LeadStore
+        from .shared_state import SharedState
+        from .lead_events import LeadEventDispatcher, load_webhook_targets
+
+        if db is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            self.client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            db = self.client[os.environ['DB_NAME']]
+
+        self.db = db
+        self.kavvi_api = KAVVIAPIService()
+        self.google_calendar = GoogleCalendarService()
+        self.shared_state = SharedState()
+        self.rate_limiter = RateLimiter(db.rate_limits, self.shared_state)
+        self.lead_store = LeadStore(db.leads)
+        self.started = True
+
+        # Index creation talks to Mongo - don't hold up readiness for it
+        self._background_tasks.append(asyncio.create_task(self._ensure_indexes()))
+
+        targets = load_webhook_targets()
+        if targets:
+            self.lead_events = LeadEventDispatcher(db, self.lead_store, targets)
+            self._background_tasks.append(asyncio.create_task(self.lead_events.run()))
+
+        logger.info("Services started")
+
+    async def _ensure_indexes(self):
+        try:
+            await self.lead_store.ensure_indexes()
+        except Exception as e:
+            logger.error("Lead index creation failed: %s", e)
+
+    async def shutdown(self):
+        """Stop background work and close clients"""
+        for task in self._background_tasks:
+            task.cancel()
+        # Let tasks finish their cleanup (e.g. releasing the webhook lease) before the client closes
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks = []
+
+        if self.shared_state is not None:
+            await self.shared_state.close()
+        if self.client is not None:
+            self.client.close()
+        self.started = False
+
+    async def check_ready(self) -> bool:
+        """Whether the services are started and the database answers"""
+        if not self.started:
+            return False
+        try:
+            await self.db.command("ping")
+            return True
+        except Exception as e:
+            logger.warning("Readiness check failed: %s", e)
+            return False
+
+
+services = ServiceContainer()
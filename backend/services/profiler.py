@@ -0,0 +1,238 @@
+import asyncio
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Frame = Tuple[str, str, int]  # (function, file, line)
+
+
+def frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (code.co_name, code.co_filename, frame.f_lineno)
+
+
+def await_chain(coro) -> List[Frame]:
+    """Frames of a suspended coroutine, following what it awaits (outermost first)"""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        stack.append(frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+class RequestProfile:
+    """Stack samples collected for a single request"""
+
+    def __init__(self, method: str, path: str, task: Optional[asyncio.Task], interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.task = task
+        self.interval = interval
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.status_code: Optional[int] = None
+        self.samples: Counter = Counter()
+        self.files: Dict[str, str] = {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration * 1000, 2),
+            "sample_count": sum(self.samples.values()),
+            "started_at": self.started_at,
+            "files": self.files,
+        }
+
+    def collapsed(self) -> str:
+        """Collapsed-stack format (one `frame;frame;frame count` line per stack)"""
+        lines = []
+        for stack, count in self.samples.items():
+            names = [f"{name} ({Path(filename).name}:{line})" for name, filename, line in stack]
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Speedscope sampled-profile document"""
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        interval_ms = self.interval * 1000
+
+        for stack, count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(count * interval_ms)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(self.duration * 1000, 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": f"{self.method} {self.path} ({self.id})",
+            "exporter": "kavvi-landing",
+        }
+
+
+class RequestProfiler:
+    """
+    Opt-in sampling profiler for individual requests. A background thread
+    samples the event loop thread while profiled requests are in flight;
+    when a request's task is suspended its await chain is recorded instead,
+    so time spent waiting on Mongo or aiohttp shows up in the profile.
+    """
+
+    def __init__(self):
+        self.sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+        self.interval = float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000
+        self.keep_slowest = int(os.environ.get('PROFILE_KEEP_SLOWEST', '20'))
+        self.output_dir = Path(os.environ.get('PROFILE_DIR', '/tmp/kavvi-profiles'))
+
+        self._active: Dict[str, RequestProfile] = {}
+        self._slowest: List[Tuple[float, str, RequestProfile]] = []  # min-heap on duration
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self, method: str, path: str) -> RequestProfile:
+        """Start profiling the current request task"""
+        profile = RequestProfile(method, path, asyncio.current_task(), self.interval)
+        self._loop_thread_id = threading.get_ident()
+        with self._lock:
+            self._active[profile.id] = profile
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return profile
+
+    async def finish(self, profile: RequestProfile):
+        """Stop sampling a request and keep it if it is among the slowest"""
+        profile.duration = time.perf_counter() - profile.started
+        with self._lock:
+            self._active.pop(profile.id, None)
+            if not self._active:
+                self._wakeup.clear()
+
+            evicted = None
+            entry = (profile.duration, profile.id, profile)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif profile.duration > self._slowest[0][0]:
+                evicted = heapq.heapreplace(self._slowest, entry)[2]
+            else:
+                return
+        profile.task = None
+
+        await asyncio.to_thread(self._write_files, profile, evicted)
+
+    def slowest(self) -> List[RequestProfile]:
+        with self._lock:
+            return [entry[2] for entry in sorted(self._slowest, reverse=True)]
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            for _, entry_id, profile in self._slowest:
+                if entry_id == profile_id:
+                    return profile
+        return None
+
+    def _write_files(self, profile: RequestProfile, evicted: Optional[RequestProfile]):
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            base = self.output_dir / f"{int(profile.started_at)}_{profile.id}"
+
+            collapsed_path = base.with_suffix(".collapsed.txt")
+            collapsed_path.write_text(profile.collapsed())
+            speedscope_path = base.with_suffix(".speedscope.json")
+            speedscope_path.write_text(json.dumps(profile.speedscope()))
+            profile.files = {"collapsed": str(collapsed_path), "speedscope": str(speedscope_path)}
+
+            if evicted:
+                for path in evicted.files.values():
+                    Path(path).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Could not write request profile %s: %s", profile.id, e)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+
+            thread_frame = sys._current_frames().get(self._loop_thread_id)
+            thread_stack = []
+            while thread_frame is not None:
+                thread_stack.append(thread_frame)
+                thread_frame = thread_frame.f_back
+            thread_stack.reverse()
+
+            sampled = []
+            for profile in active:
+                try:
+                    stack = self._sample(profile, thread_stack)
+                except Exception:
+                    continue  # Coroutine state changed under us - drop this sample
+                if stack:
+                    sampled.append((profile, stack))
+
+            # Counted under the lock, and only while still active: once finish()
+            # has run, the samples are read from another thread to write files
+            with self._lock:
+                for profile, stack in sampled:
+                    if profile.id in self._active:
+                        profile.samples[stack] += 1
+
+    def _sample(self, profile: RequestProfile, thread_stack) -> Optional[Tuple[Frame, ...]]:
+        task = profile.task
+        if task is None or task.done():
+            return None
+        coro = task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+
+        # Task is running on the loop thread: record the real call stack from its root
+        for index, frame in enumerate(thread_stack):
+            if frame is root:
+                return tuple(frame_key(f) for f in thread_stack[index:])
+
+        # Task is suspended: record where it is awaiting
+        chain = await_chain(coro)
+        if not chain:
+            return None
+        return tuple(chain) + (("<await>", "", 0),)
+
+
+request_profiler = RequestProfiler()
@@ -1,14 +1,19 @@
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Optional, Tuple, TYPE_CHECKING
 import logging
-from motor.motor_asyncio import AsyncIOMotorCollection
 from ..models import RateLimitRecord
+from .shared_state import SharedState
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorCollection
 
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
-    def __init__(self, db_collection: AsyncIOMotorCollection):
+    def __init__(self, db_collection: "AsyncIOMotorCollection", shared_state: Optional[SharedState] = None):
         self.collection = db_collection
+        # When a shared state backend is configured it replaces the Mongo counters
+        self.shared_state = shared_state if shared_state is not None and shared_state.enabled else None
         self.ip_window_hours = 1  # 1 hour window
         self.ip_max_attempts = 5  # 5 attempts per hour per IP
         self.email_window_hours = 24  # 24 hour window
@@ -17,14 +22,21 @@ class RateLimiter:
     async def check_ip_rate_limit(self, ip_address: str) -> Tuple[bool, Optional[str]]:
         """Check if IP address is rate limited"""
         try:
-            now = datetime.utcnow()
-            window_start = now - timedelta(hours=self.ip_window_hours)
-            
-            # Count attempts in current window
-            count = await self.collection.count_documents({
-                "ip_address": ip_address,
-                "window_start": {"$gte": window_start}
-            })
+            if self.shared_state:
+                # Checks and records the attempt atomically
+                allowed, _ = await self.shared_state.window_acquire(
+                    f"rl:ip:{ip_address}", self.ip_window_hours * 3600, self.ip_max_attempts
+                )
+                count = 0 if allowed else self.ip_max_attempts
+            else:
+                now = datetime.utcnow()
+                window_start = now - timedelta(hours=self.ip_window_hours)
+                
+                # Count attempts in current window
+                count = await self.collection.count_documents({
+                    "ip_address": ip_address,
+                    "window_start": {"$gte": window_start}
+                })
             
             if count >= self.ip_max_attempts:
                 return False, f"Muitas tentativas deste IP. Tente novamente em {self.ip_window_hours} hora(s)"
@@ -32,20 +44,27 @@ class RateLimiter:
             return True, None
             
         except Exception as e:
-            logger.error(f"Rate limit check error: {e}")
+            logger.error("Rate limit check error: %s", e)
             return True, None  # Allow on error
     
     async def check_email_rate_limit(self, email: str) -> Tuple[bool, Optional[str]]:
         """Check if email is rate limited"""
         try:
-            now = datetime.utcnow()
-            window_start = now - timedelta(hours=self.email_window_hours)
-            
-            # Count attempts for this email in current window
-            count = await self.collection.count_documents({
-                "email": email,
-                "window_start": {"$gte": window_start}
-            })
+            if self.shared_state:
+                # Checks and records the attempt atomically
+                allowed, _ = await self.shared_state.window_acquire(
+                    f"rl:email:{email}", self.email_window_hours * 3600, self.email_max_attempts
+                )
+                count = 0 if allowed else self.email_max_attempts
+            else:
+                now = datetime.utcnow()
+                window_start = now - timedelta(hours=self.email_window_hours)
+                
+                # Count attempts for this email in current window
+                count = await self.collection.count_documents({
+                    "email": email,
+                    "window_start": {"$gte": window_start}
+                })
             
             if count >= self.email_max_attempts:
                 return False, f"Muitas tentativas com este email. Tente novamente em {self.email_window_hours} horas"
@@ -53,11 +72,14 @@ class RateLimiter:
             return True, None
             
         except Exception as e:
-            logger.error(f"Email rate limit check error: {e}")
+            logger.error("Email rate limit check error: %s", e)
             return True, None  # Allow on error
     
     async def record_attempt(self, ip_address: str, email: Optional[str] = None):
         """Record a rate limit attempt"""
+        if self.shared_state:
+            return  # Already recorded by the checks, atomically with the limit check
+        
         try:
             record = RateLimitRecord(
                 ip_address=ip_address,
@@ -68,7 +90,7 @@ class RateLimiter:
             await self.collection.insert_one(record.dict())
             
         except Exception as e:
-            logger.error(f"Error recording rate limit attempt: {e}")
+            logger.error("Error recording rate limit attempt: %s", e)
     
     async def cleanup_old_records(self):
         """Clean up old rate limit records (run periodically)"""
@@ -80,7 +102,7 @@ class RateLimiter:
             })
             
             if result.deleted_count > 0:
-                logger.info(f"Cleaned up {result.deleted_count} old rate limit records")
+                logger.info("Cleaned up %s old rate limit records", result.deleted_count)
                 
         except Exception as e:
-            logger.error(f"Error cleaning up rate limit records: {e}")
\ No newline at end of file
+            logger.error("Error cleaning up rate limit records: %s", e)
\ No newline at end of file
@@ -0,0 +1,199 @@
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Sliding window over a sorted set: trim old entries and record this attempt
+# only if the window still has room. Returns {allowed, count}. Runs atomically
+# on the server, so concurrent checks can't both take the last slot.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local member = ARGV[4]
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+if count >= limit then
+    return {0, count}
+end
+redis.call('ZADD', key, now, member)
+redis.call('PEXPIRE', key, window)
+return {1, count + 1}
+"""
+
+
+class InProcessState:
+    """Per-worker fallback with the same interface as SharedState"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._windows: Dict[str, deque] = {}
+        # key -> (expires_at, stored result or None while the claim is in flight)
+        self._claims: Dict[str, Tuple[float, Optional[str]]] = {}
+
+    def _trim(self, key: str, now_ms: int, window_ms: int) -> deque:
+        entries = self._windows.get(key)
+        if entries is None:
+            if len(self._windows) >= self.max_keys:
+                self._windows.clear()
+            entries = self._windows[key] = deque()
+        while entries and entries[0] <= now_ms - window_ms:
+            entries.popleft()
+        return entries
+
+    async def window_acquire(self, key: str, window_seconds: int, limit: int) -> Tuple[bool, int]:
+        # No await between check and append, so this is atomic within the worker
+        now_ms = int(time.time() * 1000)
+        entries = self._trim(key, now_ms, window_seconds * 1000)
+        if len(entries) >= limit:
+            return False, len(entries)
+        entries.append(now_ms)
+        return True, len(entries)
+
+    async def release(self, key: str):
+        self._claims.pop(key, None)
+
+    async def claim(self, key: str, ttl_seconds: int) -> Tuple[bool, Optional[str]]:
+        now = time.monotonic()
+        entry = self._claims.get(key)
+        if entry and entry[0] > now:
+            return False, entry[1]
+        if len(self._claims) >= self.max_keys:
+            self._claims = {k: v for k, v in self._claims.items() if v[0] > now}
+        self._claims[key] = (now + ttl_seconds, None)
+        return True, None
+
+    async def complete(self, key: str, result: str, ttl_seconds: int):
+        if key in self._claims:
+            self._claims[key] = (time.monotonic() + ttl_seconds, result)
+
+
+class SharedState:
+    """
+    Rate-limit windows and submission dedupe keys shared between uvicorn
+    workers through a Redis-protocol server (redis-server, KeyDB, Dragonfly,
+    fakeredis...). Falls back to per-worker InProcessState whenever the
+    backend is unreachable, mirroring the limiter's allow-on-error behaviour.
+    """
+
+    def __init__(self, client: Any = None, url: Optional[str] = None, prefix: str = "kavvi:"):
+        self.url = url or os.environ.get('SHARED_STATE_URL')
+        self.prefix = prefix
+        self.client = client
+        self.local = InProcessState()
+        self.retry_seconds = 10  # how long to stay on the fallback after an error
+        self._down_until = 0.0
+
+        # Near cache of windows known to be full: skips the round-trip for
+        # clients that keep hammering after being limited
+        self._blocked: Dict[str, Tuple[int, float]] = {}
+
+        if self.client is None and self.url:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                logger.warning("SHARED_STATE_URL is set but the redis package is not installed")
+            else:
+                self.client = redis.from_url(self.url, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+        # register_script reloads the script transparently after NOSCRIPT, also in pipelines
+        self._sliding_window = self.client.register_script(SLIDING_WINDOW_SCRIPT) if self.client is not None else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    def _available(self) -> bool:
+        return self.client is not None and time.monotonic() >= self._down_until
+
+    def _mark_down(self, error: Exception):
+        if time.monotonic() >= self._down_until:
+            logger.warning("Shared state backend unavailable, using in-process state: %s", error)
+        self._down_until = time.monotonic() + self.retry_seconds
+
+    async def window_acquire(self, key: str, window_seconds: int, limit: int) -> Tuple[bool, int]:
+        """
+        Record an attempt in the sliding window for `key` if fewer than `limit`
+        attempts happened in the last `window_seconds`, in one atomic step.
+        Returns: (allowed, attempts_in_window)
+        """
+        blocked = self._blocked.get(key)
+        if blocked and blocked[1] > time.monotonic():
+            return False, blocked[0]
+
+        if not self._available():
+            return await self.local.window_acquire(key, window_seconds, limit)
+
+        now_ms = int(time.time() * 1000)
+        member = f"{now_ms}-{id(self)}-{time.perf_counter_ns()}"
+        try:
+            allowed, count = await self._sliding_window(
+                keys=[self.prefix + key],
+                args=[now_ms, window_seconds * 1000, limit, member],
+            )
+        except Exception as e:
+            self._mark_down(e)
+            return await self.local.window_acquire(key, window_seconds, limit)
+
+        allowed, count = bool(int(allowed)), int(count)
+        if not allowed:
+            if len(self._blocked) >= 10000:
+                self._blocked.clear()
+            # The oldest attempt can't leave the window sooner than this
+            self._blocked[key] = (count, time.monotonic() + min(window_seconds, 60))
+        return allowed, count
+
+    async def claim(self, key: str, ttl_seconds: int) -> Tuple[bool, Optional[str]]:
+        """
+        Claim `key` for `ttl_seconds`. When another request already holds it,
+        also return the result that request stored with complete() (None while
+        it is still in flight). One pipelined round-trip either way.
+        Returns: (claimed, stored_result)
+        """
+        if not self._available():
+            return await self.local.claim(key, ttl_seconds)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(self.prefix + key, b"", nx=True, ex=ttl_seconds)
+                pipe.get(self.prefix + key)
+                claimed, stored = await pipe.execute()
+        except Exception as e:
+            self._mark_down(e)
+            return await self.local.claim(key, ttl_seconds)
+        if claimed:
+            return True, None
+        return False, stored.decode("utf-8") if stored else None
+
+    async def complete(self, key: str, result: str, ttl_seconds: int):
+        """Store the claimed request's result for duplicates to return - never raises"""
+        if not self._available():
+            await self.local.complete(key, result, ttl_seconds)
+            return
+        try:
+            await self.client.set(self.prefix + key, result.encode("utf-8"), xx=True, ex=ttl_seconds)
+        except Exception as e:
+            self._mark_down(e)
+            await self.local.complete(key, result, ttl_seconds)
+
+    async def release(self, key: str):
+        """Release a claim early, e.g. when the claimed request failed"""
+        await self.local.release(key)
+        if not self._available():
+            return
+        try:
+            await self.client.delete(self.prefix + key)
+        except Exception as e:
+            self._mark_down(e)
+
+    async def close(self):
+        if self.client is not None:
+            try:
+                await self.client.aclose()
+            except AttributeError:
+                await self.client.close()
+            except Exception as e:
+                logger.warning("Error closing shared state client: %s", e)
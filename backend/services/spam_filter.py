@@ -0,0 +1,161 @@
+import hashlib
+import math
+import re
+import time
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Disposable / throwaway email providers commonly used by form bots
+DISPOSABLE_EMAIL_DOMAINS = [
+    "10minutemail.com", "20minutemail.com", "33mail.com", "anonbox.net",
+    "burnermail.io", "discard.email", "dispostable.com", "emailondeck.com",
+    "fakeinbox.com", "getairmail.com", "getnada.com", "guerrillamail.com",
+    "guerrillamail.net", "guerrillamailblock.com", "harakirimail.com",
+    "incognitomail.org", "mailcatch.com", "maildrop.cc", "mailinator.com",
+    "mailnesia.com", "mailsac.com", "mintemail.com", "mohmal.com",
+    "mytemp.email", "sharklasers.com", "spamgourmet.com", "temp-mail.org",
+    "tempail.com", "tempmail.com", "tempmail.net", "tempmailo.com",
+    "tempr.email", "throwawaymail.com", "trashmail.com", "trashmail.de",
+    "yopmail.com", "yopmail.net",
+]
+
+# User-Agent fragments that never belong to a real visitor filling the form
+BOT_USER_AGENT_PATTERN = re.compile(
+    r"(bot|crawl|spider|scrap|curl|wget|python-requests|python-urllib|aiohttp|httpx|"
+    r"go-http-client|java/|okhttp|libwww|headlesschrome|phantomjs|selenium|puppeteer)",
+    re.IGNORECASE,
+)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a single blake2b digest"""
+
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, value: str):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class SpamFilter:
+    """
+    Cheap in-memory pre-filter that runs before any database or upstream I/O.
+    Combines a decaying IP reputation score, a Bloom filter of known-bad
+    emails/domains and User-Agent heuristics. Verdicts are cached per IP.
+    """
+
+    def __init__(self, bad_values: Optional[Iterable[str]] = None):
+        self.block_threshold = 10.0  # reputation score that blocks an IP
+        self.half_life_seconds = 600  # score halves every 10 minutes
+        self.verdict_ttl_seconds = 30  # how long a verdict is reused per IP
+        self.max_tracked_ips = 50000
+
+        self.penalties = {
+            "bad_user_agent": 4.0,
+            "bad_email": 5.0,
+            "rate_limited": 3.0,
+            "honeypot": 10.0,
+        }
+
+        self.bad_values = BloomFilter(capacity=10000)
+        for value in bad_values if bad_values is not None else DISPOSABLE_EMAIL_DOMAINS:
+            self.bad_values.add(value.lower())
+
+        # ip -> (score, last_update)
+        self._reputation: Dict[str, Tuple[float, float]] = {}
+        # ip -> (allowed, reason, expires_at)
+        self._verdicts: Dict[str, Tuple[bool, Optional[str], float]] = {}
+
+    def _decayed_score(self, ip_address: str, now: float) -> float:
+        entry = self._reputation.get(ip_address)
+        if not entry:
+            return 0.0
+        score, last_update = entry
+        return score * 0.5 ** ((now - last_update) / self.half_life_seconds)
+
+    def penalize(self, ip_address: str, reason: str):
+        """Increase the reputation score of an IP after abusive behaviour"""
+        now = time.monotonic()
+        score = self._decayed_score(ip_address, now) + self.penalties.get(reason, 1.0)
+
+        if ip_address not in self._reputation and len(self._reputation) >= self.max_tracked_ips:
+            self._evict(now)
+
+        self._reputation[ip_address] = (score, now)
+        self._verdicts.pop(ip_address, None)
+
+        if score >= self.block_threshold:
+            logger.warning("IP %s blocked by spam filter (%s, score %.1f)", ip_address, reason, score)
+
+    def _evict(self, now: float):
+        """Drop IPs whose score has decayed to nothing, or the oldest half if none have"""
+        stale = [ip for ip in self._reputation if self._decayed_score(ip, now) < 0.5]
+        if not stale:
+            by_age = sorted(self._reputation.items(), key=lambda item: item[1][1])
+            stale = [ip for ip, _ in by_age[: len(by_age) // 2]]
+        for ip in stale:
+            self._reputation.pop(ip, None)
+            self._verdicts.pop(ip, None)
+
+    def is_suspicious_user_agent(self, user_agent: str) -> bool:
+        """Check User-Agent against bot heuristics"""
+        if not user_agent or len(user_agent) < 10:
+            return True
+        return bool(BOT_USER_AGENT_PATTERN.search(user_agent))
+
+    def check_request(self, ip_address: str, user_agent: str) -> Tuple[bool, Optional[str]]:
+        """Check User-Agent and IP reputation, reusing a cached reputation verdict when possible"""
+        # The User-Agent differs per request (shared/NAT IPs), so it is never served from the cache
+        if self.is_suspicious_user_agent(user_agent):
+            self.penalize(ip_address, "bad_user_agent")
+            return False, "bad_user_agent"
+
+        now = time.monotonic()
+        cached = self._verdicts.get(ip_address)
+        if cached and cached[2] > now:
+            return cached[0], cached[1]
+
+        if self._decayed_score(ip_address, now) >= self.block_threshold:
+            allowed, reason = False, "bad_reputation"
+        else:
+            allowed, reason = True, None
+
+        if len(self._verdicts) >= self.max_tracked_ips:
+            self._verdicts.clear()
+        self._verdicts[ip_address] = (allowed, reason, now + self.verdict_ttl_seconds)
+
+        return allowed, reason
+
+    def check_email(self, email: str, ip_address: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """Check an email address and its domain against the known-bad Bloom filter"""
+        email = (email or "").strip().lower()
+        domain = email.rsplit("@", 1)[-1]
+
+        if email in self.bad_values or domain in self.bad_values:
+            if ip_address:
+                self.penalize(ip_address, "bad_email")
+            return False, "bad_email"
+
+        return True, None
+
+    def add_bad_value(self, value: str):
+        """Register an email address or domain as known-bad"""
+        self.bad_values.add(value.strip().lower())
+
+
+spam_filter = SpamFilter()
@@ -0,0 +1,171 @@
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Demos happen in Brasília time regardless of the visitor's timezone
+BUSINESS_TIMEZONE = "America/Sao_Paulo"
+BUSINESS_START = time(9, 0)
+BUSINESS_END = time(18, 0)
+SLOT_MINUTES = 30
+MAX_DAYS_AHEAD = 30
+
+# Brazilian national holidays on fixed dates (month, day)
+FIXED_HOLIDAYS = [
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (11, 20),  # Dia da Consciência Negra
+    (12, 25),  # Natal
+]
+
+# Holidays relative to Easter Sunday (days offset)
+EASTER_HOLIDAYS = [
+    -48,  # Carnaval (segunda)
+    -47,  # Carnaval (terça)
+    -2,   # Sexta-feira Santa
+    60,   # Corpus Christi
+]
+
+
+@lru_cache(maxsize=32)
+def get_zone(name: str) -> Optional[ZoneInfo]:
+    """Cached ZoneInfo lookup; None for unknown zone names"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    el = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * el) // 451
+    month, day = divmod(h + el - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=16)
+def holidays_for_year(year: int) -> FrozenSet[date]:
+    """National holidays for a year, computed once per year"""
+    easter = easter_sunday(year)
+    fixed = {date(year, month, day) for month, day in FIXED_HOLIDAYS}
+    moving = {easter + timedelta(days=offset) for offset in EASTER_HOLIDAYS}
+    return frozenset(fixed | moving)
+
+
+def is_business_day(day: date) -> bool:
+    return day.weekday() < 5 and day not in holidays_for_year(day.year)
+
+
+def to_business_time(value: datetime, tz_name: str = BUSINESS_TIMEZONE) -> Optional[datetime]:
+    """
+    Convert a requested datetime to Brasília time. Naive datetimes are read in
+    `tz_name` (the visitor's timezone); aware ones keep their own offset.
+    """
+    business_zone = get_zone(BUSINESS_TIMEZONE)
+    if value.tzinfo is None:
+        zone = get_zone(tz_name)
+        if zone is None:
+            return None
+        value = value.replace(tzinfo=zone)
+    return value.astimezone(business_zone)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Naive UTC datetime, the convention used for stored timestamps"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _check_business_slot(local: datetime, now: datetime, latest: datetime) -> Optional[str]:
+    if local <= now:
+        return 'future_date_required'
+    if local > latest:
+        return 'demo_too_far'
+    if local.weekday() >= 5:
+        return 'weekdays_only'
+    if local.date() in holidays_for_year(local.year):
+        return 'holiday_not_available'
+    slot_end = (local + timedelta(minutes=SLOT_MINUTES)).time()
+    if local.time() < BUSINESS_START or local.time() >= BUSINESS_END or slot_end > BUSINESS_END:
+        return 'business_hours_only'
+    return None
+
+
+def _window(now: Optional[datetime]) -> Tuple[datetime, datetime]:
+    business_zone = get_zone(BUSINESS_TIMEZONE)
+    now = (now or datetime.now(timezone.utc)).astimezone(business_zone)
+    latest = datetime.combine(now.date() + timedelta(days=MAX_DAYS_AHEAD), time(23, 59, 59), tzinfo=business_zone)
+    return now, latest
+
+
+def validate_slots(
+    values: Iterable[datetime],
+    tz_name: str = BUSINESS_TIMEZONE,
+    now: Optional[datetime] = None
+) -> List[Tuple[bool, Optional[str]]]:
+    """
+    Validate many candidate demo datetimes in one call.
+    Returns one (is_valid, error_key) per value; error keys are ERROR_MESSAGES keys.
+    """
+    if get_zone(tz_name) is None:
+        return [(False, 'invalid_timezone') for _ in values]
+
+    now, latest = _window(now)
+    results = []
+    for value in values:
+        local = to_business_time(value, tz_name)
+        error = _check_business_slot(local, now, latest)
+        results.append((error is None, error))
+    return results
+
+
+def validate_slot(
+    value: datetime,
+    tz_name: str = BUSINESS_TIMEZONE,
+    now: Optional[datetime] = None
+) -> Tuple[bool, Optional[str]]:
+    """Validate a single demo datetime. Returns (is_valid, error_key)."""
+    return validate_slots([value], tz_name, now)[0]
+
+
+def generate_slots(
+    days: int = 7,
+    tz_name: str = BUSINESS_TIMEZONE,
+    now: Optional[datetime] = None
+) -> List[datetime]:
+    """All bookable slots in the next `days` days, as aware datetimes in `tz_name`"""
+    zone = get_zone(tz_name)
+    if zone is None:
+        return []
+
+    now, latest = _window(now)
+    business_zone = now.tzinfo
+    last_day = min(now.date() + timedelta(days=days), latest.date())
+    slots_per_day = int(
+        (datetime.combine(date.min, BUSINESS_END) - datetime.combine(date.min, BUSINESS_START)).total_seconds()
+        // (SLOT_MINUTES * 60)
+    )
+
+    slots = []
+    day = now.date()
+    while day <= last_day:
+        if is_business_day(day):
+            start = datetime.combine(day, BUSINESS_START, tzinfo=business_zone)
+            for index in range(slots_per_day):
+                slot = start + timedelta(minutes=SLOT_MINUTES * index)
+                if slot > now:
+                    slots.append(slot.astimezone(zone))
+        day += timedelta(days=1)
+    return slots
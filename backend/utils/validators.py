@@ -1,6 +1,5 @@
 import re
 from typing import Dict, Any, Tuple, Optional
-from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
@@ -43,6 +42,10 @@ def validate_email(email: str) -> Tuple[bool, Optional[str]]:
     
     return True, None
 
+def normalize_email(email: str) -> str:
+    """Normalize email for deduplication (trimmed, lowercase)"""
+    return (email or "").strip().lower()
+
 def sanitize_input(text: str, max_length: int = 500) -> str:
     """Sanitize text input"""
     if not text:
@@ -71,31 +74,6 @@ def extract_utm_from_request(request_data: Dict[str, Any]) -> Dict[str, Any]:
     
     return utm_data
 
-def validate_demo_datetime(demo_datetime: datetime) -> Tuple[bool, Optional[str]]:
-    """Validate demo scheduling datetime"""
-    now = datetime.utcnow()
-    
-    # Must be in the future
-    if demo_datetime <= now:
-        return False, "Data/hora deve ser no futuro"
-    
-    # Must be within next 30 days
-    max_date = now.replace(hour=23, minute=59, second=59) + timedelta(days=30)
-    if demo_datetime > max_date:
-        return False, "Data deve ser dentro dos próximos 30 dias"
-    
-    # Must be during business hours (9 AM - 6 PM Brazil time)
-    # Convert to Brazil time for validation
-    brazil_hour = demo_datetime.hour  # Simplified - should use proper timezone conversion
-    if brazil_hour < 9 or brazil_hour >= 18:
-        return False, "Horário deve ser das 9h às 18h (horário de Brasília)"
-    
-    # No weekends (Saturday = 5, Sunday = 6)
-    if demo_datetime.weekday() >= 5:
-        return False, "Demos apenas em dias úteis (segunda a sexta)"
-    
-    return True, None
-
 ERROR_MESSAGES = {
     'required_field': "Este campo é obrigatório",
     'invalid_email': "Por favor, insira um email válido",
@@ -107,9 +85,17 @@ ERROR_MESSAGES = {
     'trial_exists': "Você já possui um trial ativo",
     'honeypot_detected': "Solicitação inválida detectada",
     'invalid_datetime': "Data/hora inválida",
-    'business_hours_only': "Demos disponíveis apenas em horário comercial",
+    'business_hours_only': "Horário deve ser das 9h às 18h (horário de Brasília)",
     'future_date_required': "Selecione uma data futura",
-    'weekdays_only': "Demos apenas em dias úteis"
+    'weekdays_only': "Demos apenas em dias úteis",
+    'holiday_not_available': "Demos não disponíveis em feriados nacionais",
+    'demo_too_far': "Data deve ser dentro dos próximos 30 dias",
+    'invalid_timezone': "Fuso horário inválido",
+    'overloaded': "Serviço temporariamente sobrecarregado. Tente novamente em instantes",
+    'lead_not_found': "Cadastro não encontrado",
+    'payload_too_large': "Dados enviados excedem o tamanho máximo",
+    'invalid_encoding': "Conteúdo compactado inválido",
+    'unsupported_encoding': "Codificação de conteúdo não suportada"
 }
 
 def get_error_message(error_key: str, default: str = None) -> str:
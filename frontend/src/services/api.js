@@ -106,6 +106,41 @@ export const landingAPI = {
     }
   },
 
+  // Bookable demo slots for the next `days` days, in the visitor's timezone
+  getDemoSlots: async (days = 7) => {
+    try {
+      const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone || 'America/Sao_Paulo';
+      const response = await api.get('/landings/demo/slots', { params: { days, timezone } });
+      return {
+        success: true,
+        slots: response.data.slots
+      };
+    } catch (error) {
+      console.error('Demo slots error:', error);
+      return {
+        success: false,
+        slots: []
+      };
+    }
+  },
+
+  // Trial/demo status for confirmation pages (lead_id comes from submitForm/scheduleDemo)
+  getLeadStatus: async (leadId) => {
+    try {
+      const response = await api.get(`/landings/leads/${encodeURIComponent(leadId)}`);
+      return {
+        success: true,
+        data: response.data
+      };
+    } catch (error) {
+      console.error('Lead status error:', error);
+      return {
+        success: false,
+        error: error.response?.data?.detail || 'Erro interno. Tente novamente.'
+      };
+    }
+  },
+
   // Health check
   healthCheck: async () => {
     try {
@@ -118,45 +153,114 @@ export const landingAPI = {
   }
 };
 
+// Analytics event batching: events are queued and sent together to
+// /analytics/batch, flushed on a timer, when the queue fills up, and with
+// sendBeacon when the page is hidden so nothing is lost on navigation.
+const ANALYTICS_BATCH_URL = `${API_BASE}/analytics/batch`;
+const ANALYTICS_FLUSH_DELAY = 2000;
+const ANALYTICS_MAX_BATCH = 20;
+
+const createSessionId = () => {
+  try {
+    const stored = window.sessionStorage.getItem('kavvi_session_id');
+    if (stored) return stored;
+    const id = window.crypto?.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    window.sessionStorage.setItem('kavvi_session_id', id);
+    return id;
+  } catch (error) {
+    return undefined;
+  }
+};
+
+const sessionId = createSessionId();
+let eventQueue = [];
+let flushTimer = null;
+
+const flushEvents = async ({ useBeacon = false } = {}) => {
+  if (flushTimer) {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+  }
+  if (eventQueue.length === 0) return;
+
+  const events = eventQueue;
+  eventQueue = [];
+
+  // text/plain keeps sendBeacon a simple request (no CORS preflight)
+  const body = JSON.stringify({ events });
+  if (useBeacon && navigator.sendBeacon) {
+    if (navigator.sendBeacon(ANALYTICS_BATCH_URL, new Blob([body], { type: 'text/plain' }))) {
+      return;
+    }
+  }
+
+  try {
+    await api.post('/analytics/batch', body, {
+      headers: { 'Content-Type': 'text/plain' }
+    });
+  } catch (error) {
+    console.warn('Analytics batch failed:', error);
+  }
+};
+
+const queueEvent = (event, properties = {}) => {
+  eventQueue.push({
+    event,
+    properties,
+    session_id: sessionId,
+    timestamp: new Date().toISOString()
+  });
+
+  if (eventQueue.length >= ANALYTICS_MAX_BATCH) {
+    return flushEvents();
+  }
+  if (!flushTimer) {
+    flushTimer = setTimeout(() => flushEvents(), ANALYTICS_FLUSH_DELAY);
+  }
+  return Promise.resolve();
+};
+
+if (typeof window !== 'undefined') {
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+      flushEvents({ useBeacon: true });
+    }
+  });
+  window.addEventListener('pagehide', () => flushEvents({ useBeacon: true }));
+}
+
 export const analyticsAPI = {
   // Track page view
   trackPageView: async (properties = {}) => {
-    try {
-      await api.post('/analytics/page_view', {
-        ...properties,
-        ...globalUTM
-      });
-    } catch (error) {
-      console.warn('Analytics page view failed:', error);
-    }
+    await queueEvent('landing_view', {
+      page: 'whatsapp-lead-generation',
+      ...properties,
+      ...globalUTM
+    });
   },
 
   // Track CTA clicks
-  trackCTAClick: async (ctaData) => {
-    try {
-      await api.post('/analytics/cta_click', {
-        ...ctaData,
-        utm: globalUTM
-      });
-    } catch (error) {
-      console.warn('Analytics CTA click failed:', error);
-    }
+  trackCTAClick: async (ctaData = {}) => {
+    await queueEvent('cta_click', {
+      page: 'whatsapp-lead-generation',
+      cta_type: ctaData.cta_type || 'unknown',
+      cta_location: ctaData.cta_location || 'unknown',
+      ...globalUTM
+    });
   },
 
   // Track generic events
   trackEvent: async (eventData) => {
-    try {
-      await api.post('/analytics/track', {
-        ...eventData,
-        properties: {
-          ...eventData.properties,
-          ...globalUTM
-        }
-      });
-    } catch (error) {
-      console.warn('Analytics event failed:', error);
-    }
-  }
+    await queueEvent(eventData.event, {
+      ...eventData.properties,
+      ...globalUTM
+    });
+  },
+
+  // Send queued events immediately
+  flush: () => flushEvents()
 };
 
 // Error messages in Portuguese
@@ -0,0 +1,48 @@
+"""Admin lead updates go through LeadStore.update and refresh the status endpoint's cache."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.models import LeadRecord
+from backend.routes.admin import router
+from backend.services.lead_store import LeadStore
+from backend.services.lifecycle import services
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-token"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-token")
+    monkeypatch.setattr(services, "lead_store", LeadStore(AsyncMongoMockClient().db.leads))
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return TestClient(app)
+
+
+def create_lead() -> LeadRecord:
+    lead = LeadRecord(name="Ana", email="ana@example.com", whatsapp="+5511999999999", action_type="trial")
+    stored, _ = asyncio.run(services.lead_store.upsert(lead))
+    return stored
+
+
+def test_update_lead_status_and_external_id(client):
+    lead = create_lead()
+    response = client.patch(f"/api/admin/leads/{lead.id}", json={"status": "converted", "external_lead_id": "k-42"},
+                            headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["status"] == "converted"
+
+    cached, cached_lead = services.lead_store.cache.get(lead.id)
+    assert cached and cached_lead.status == "converted"
+    assert cached_lead.external_lead_id == "k-42"
+
+
+def test_update_lead_rejects_empty_and_unknown(client):
+    lead = create_lead()
+    assert client.patch(f"/api/admin/leads/{lead.id}", json={}, headers=ADMIN_HEADERS).status_code == 400
+    assert client.patch("/api/admin/leads/not-a-uuid", json={"status": "lost"}, headers=ADMIN_HEADERS).status_code == 404
+    assert client.patch(f"/api/admin/leads/{lead.id}", json={"status": "lost"}).status_code == 403
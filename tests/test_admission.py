@@ -0,0 +1,70 @@
+"""Slots handed to a queued request must not leak when that request gives up."""
+import asyncio
+
+from backend.middleware.admission import AdaptiveLimiter
+
+
+def make_limiter() -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        "test", initial_limit=1, min_limit=1, max_limit=1, max_queue=4,
+        max_wait_seconds=1.0, latency_target_seconds=1.0, retry_after_seconds=1,
+    )
+
+
+def test_slot_handed_to_cancelled_waiter_is_returned():
+    async def run():
+        limiter = make_limiter()
+        assert await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release(0.01)  # Hands the slot to the queued request...
+        waiter.cancel()        # ...which is cancelled before it resumes
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert limiter.in_flight == 0
+        assert await limiter.acquire()
+
+    asyncio.run(run())
+
+
+def test_slot_passes_to_next_waiter_when_one_is_cancelled():
+    async def run():
+        limiter = make_limiter()
+        assert await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release(0.01)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+
+        assert await second
+        assert limiter.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_concurrency_follows_a_rising_limit_while_requests_are_queued():
+    async def run():
+        limiter = AdaptiveLimiter(
+            "test", initial_limit=2, min_limit=1, max_limit=10, max_queue=200,
+            max_wait_seconds=10.0, latency_target_seconds=1.0, retry_after_seconds=1,
+        )
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            assert await limiter.acquire()
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.001)
+            limiter.release(0.001)
+
+        await asyncio.gather(*[request() for _ in range(200)])
+
+        assert int(limiter.limit) == 10
+        assert peak >= 8
+        assert limiter.in_flight == 0 and limiter.queue_depth == 0
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+"""Analytics batches: per-event enrichment, the background upstream send and the body size cap."""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.middleware.compression import MAX_DECOMPRESSED_REQUEST_BYTES, GzipRequestMiddleware
+from backend.routes.analytics import router
+from backend.services.lifecycle import services
+
+
+class RecordingKAVVI:
+    def __init__(self):
+        self.batches = []
+
+    async def send_analytics_events(self, events):
+        self.batches.append(events)
+        return True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(services, "kavvi_api", RecordingKAVVI())
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.add_middleware(GzipRequestMiddleware)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_batch_events_are_enriched_and_sent_after_the_response(client):
+    events = [
+        {"event": "landing_view", "session_id": "s1", "timestamp": "2026-03-02T12:00:00",
+         "properties": {"page": "pricing", "ip_address": "1.2.3.4"}},
+        {"event": "cta_click", "properties": {"cta_type": "trial"}},
+        {"event": "not_an_event"},
+    ]
+    response = client.post(
+        "/api/analytics/batch",
+        content=json.dumps({"events": events}),
+        headers={"Content-Type": "text/plain", "User-Agent": "Mozilla/5.0 (X11; Linux)", "Referer": "https://google.com/"},
+    )
+
+    assert response.json() == {"success": True, "accepted": 2, "rejected": 1}
+    assert len(services.kavvi_api.batches) == 1
+    first, second = services.kavvi_api.batches[0]
+
+    assert first["event"] == "landing_view"
+    assert first["session_id"] == "s1"
+    assert first["timestamp"] == "2026-03-02T12:00:00"
+    # The event's own page wins, request info overrides anything the client sent
+    assert first["properties"]["page"] == "pricing"
+    assert first["properties"]["ip_address"] == "testclient"
+    assert first["properties"]["user_agent"] == "Mozilla/5.0 (X11; Linux)"
+    assert first["properties"]["referrer"] == "https://google.com/"
+    assert second["properties"]["page"] == "whatsapp-lead-generation"
+    assert second["properties"]["cta_type"] == "trial"
+    assert second["properties"]["timestamp"] == first["properties"]["timestamp"]
+
+
+def test_empty_batch_sends_nothing(client):
+    response = client.post("/api/analytics/batch", content="[]")
+    assert response.json() == {"success": True, "accepted": 0, "rejected": 0}
+    assert services.kavvi_api.batches == []
+
+
+def test_oversized_uncompressed_batch_is_rejected(client):
+    body = json.dumps({"events": [{"event": "landing_view", "properties": {"pad": "x" * MAX_DECOMPRESSED_REQUEST_BYTES}}]})
+    response = client.post("/api/analytics/batch", content=body)
+    assert response.status_code == 413
+    assert services.kavvi_api.batches == []
+
+
+def test_oversized_streamed_batch_is_rejected(client):
+    # No Content-Length: the cap applies while reading
+    chunks = (b"x" * 65536 for _ in range(MAX_DECOMPRESSED_REQUEST_BYTES // 65536 + 1))
+    response = client.post("/api/analytics/batch", content=chunks)
+    assert response.status_code == 413
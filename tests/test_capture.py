@@ -0,0 +1,85 @@
+"""Traffic capture must not keep personal data from request bodies or query strings."""
+import asyncio
+import json
+
+import pytest
+
+from backend.middleware.capture import Sanitizer, TrafficCaptureMiddleware
+
+
+def test_unknown_analytics_properties_are_redacted():
+    sanitizer = Sanitizer()
+    body = sanitizer.value("", {"events": [{"event": "cta_click", "properties": {
+        "page": "whatsapp-lead-generation",
+        "utm_source": "google",
+        "referrer": "https://example.org/landing?email=lead@example.org",
+        "phone_number": "11999999999",
+        "session_email": "lead@example.org",
+        "extra": {"email": "lead@example.org"},
+    }}]})
+
+    properties = body["events"][0]["properties"]
+    assert properties["page"] == "whatsapp-lead-generation"
+    assert properties["utm_source"] == "google"
+    assert properties["referrer"] == "https://example.org/landing"
+    assert properties["phone_number"] == "[redacted]"
+    assert properties["session_email"] == "[redacted]"
+    assert properties["extra"] == "[redacted]"
+
+
+def test_query_string_keeps_only_allowlisted_parameters():
+    sanitizer = Sanitizer()
+    query = sanitizer.query("utm_source=google&email=lead%40example.org&token=secret")
+    assert query == "utm_source=google"
+
+
+class ListWriter:
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+async def capture(path: str, payload) -> dict:
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    middleware = TrafficCaptureMiddleware(app, path="")
+    middleware.writer = ListWriter()
+    scope = {
+        "type": "http", "method": "POST", "path": path, "query_string": b"",
+        "headers": [(b"content-type", b"application/json")], "client": ("203.0.113.9", 1234),
+    }
+    body = json.dumps(payload).encode("utf-8")
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    await middleware(scope, receive, send)
+    return middleware.writer.records[0]
+
+
+@pytest.mark.parametrize("path", ["/api/analytics/page_view", "/api/analytics/cta_click", "/api/landings/submit"])
+def test_unknown_top_level_keys_are_redacted(path):
+    payload = {
+        "cta_type": "hero",
+        "customer_note": "ligar depois das 18h",
+        "full_name": "Ana Souza",
+        "cpf": "123.456.789-09",
+        "email": "ana@example.com",
+    }
+    body = asyncio.run(capture(path, payload))["body"]
+
+    assert body["cta_type"] == "hero"
+    assert body["customer_note"] == "[redacted]"
+    assert body["full_name"] == "[redacted]"
+    assert body["cpf"] == "[redacted]"
+    assert body["email"].endswith("@example.com") and body["email"] != "ana@example.com"
+    assert "Ana Souza" not in json.dumps(body)
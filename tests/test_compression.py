@@ -0,0 +1,94 @@
+"""
+Response compression negotiation and gzip request bodies on batch endpoints,
+including the limits that keep a gzip bomb from exhausting memory.
+"""
+import gzip
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from backend.middleware.compression import (
+    COMPRESSORS, MAX_COMPRESSED_REQUEST_BYTES, MAX_DECOMPRESSED_REQUEST_BYTES, MIN_COMPRESS_SIZE,
+    CompressionMiddleware, GzipRequestMiddleware, choose_encoding,
+)
+
+BATCH_PATH = "/api/analytics/batch"
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.post(BATCH_PATH)
+    async def batch(request: Request):
+        body = await request.body()
+        return {"received": len(body), "content_encoding": request.headers.get("content-encoding")}
+
+    @app.get("/text/{size}")
+    async def text(size: int):
+        return PlainTextResponse("a" * size)
+
+    app.add_middleware(GzipRequestMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip, *;q=0", "gzip"),
+    ("deflate", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_wildcard_picks_the_preferred_encoding_unless_excluded():
+    preferred = next(iter(COMPRESSORS))
+    assert choose_encoding("*") == preferred
+    assert choose_encoding("gzip;q=0.5, *") == preferred
+    assert choose_encoding("*, gzip;q=0") != "gzip"
+
+
+def test_small_response_is_not_compressed():
+    with make_client() as client:
+        response = client.get(f"/text/{MIN_COMPRESS_SIZE - 1}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "a" * (MIN_COMPRESS_SIZE - 1)
+
+
+def test_large_response_is_compressed():
+    with make_client() as client:
+        response = client.get(f"/text/{MIN_COMPRESS_SIZE * 4}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < MIN_COMPRESS_SIZE * 4
+    assert response.text == "a" * (MIN_COMPRESS_SIZE * 4)  # Decoded by the client
+
+
+def test_gzip_request_body_is_decompressed():
+    with make_client() as client:
+        response = client.post(BATCH_PATH, content=gzip.compress(b'{"events": []}'),
+                               headers={"Content-Encoding": "gzip", "Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.json() == {"received": 14, "content_encoding": None}
+
+
+@pytest.mark.parametrize("body, encoding, status", [
+    (gzip.compress(b"0" * (MAX_DECOMPRESSED_REQUEST_BYTES + 1)), "gzip", 413),  # Bomb
+    (os.urandom(MAX_COMPRESSED_REQUEST_BYTES + 1), "gzip", 413),  # Compressed body too large
+    (b"not gzip at all", "gzip", 400),
+    (gzip.compress(b'{"events": []}')[:-8], "gzip", 400),  # Truncated
+    (b"{}", "br", 415),
+])
+def test_rejected_request_bodies(body, encoding, status):
+    with make_client() as client:
+        response = client.post(BATCH_PATH, content=body,
+                               headers={"Content-Encoding": encoding, "Accept-Encoding": "identity"})
+    assert response.status_code == status
+    assert "detail" in response.json()
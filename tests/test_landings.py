@@ -0,0 +1,65 @@
+"""Submission dedupe: duplicates get the first response, corrected resubmits are processed."""
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.routes.landings import router
+from backend.services.lead_store import LeadStore
+from backend.services.lifecycle import services
+from backend.services.rate_limiter import RateLimiter
+from backend.services.shared_state import SharedState
+
+
+class RecordingKAVVI:
+    def __init__(self):
+        self.leads = []
+
+    async def submit_lead(self, lead_data):
+        self.leads.append(lead_data)
+        return {"id": f"k-{len(self.leads)}"}
+
+    async def send_analytics_event(self, event_data):
+        return True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    shared_state = SharedState(client=fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(services, "shared_state", shared_state)
+    monkeypatch.setattr(services, "rate_limiter", RateLimiter(None, shared_state))
+    monkeypatch.setattr(services, "lead_store", LeadStore(AsyncMongoMockClient().db.leads))
+    monkeypatch.setattr(services, "kavvi_api", RecordingKAVVI())
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def submission(**fields):
+    values = {"name": "Ana Souza", "email": "ana@example.com", "whatsapp": "1133334444", "action_type": "trial"}
+    values.update(fields)
+    return values
+
+
+def test_duplicate_submit_returns_first_response(client):
+    first = client.post("/api/landings/submit", json=submission())
+    duplicate = client.post("/api/landings/submit", json=submission(email="ANA@example.com"))
+
+    assert first.status_code == duplicate.status_code == 200
+    assert first.json()["lead_id"]
+    assert duplicate.json() == first.json()
+    assert len(services.kavvi_api.leads) == 1
+
+
+def test_corrected_resubmit_is_processed(client):
+    first = client.post("/api/landings/submit", json=submission())
+    corrected = client.post("/api/landings/submit", json=submission(whatsapp="1133335555"))
+
+    assert corrected.status_code == 200
+    assert corrected.json()["trial_expires"] is not None
+    # Merged into the same lead by email, with a touchpoint per processed submission
+    assert corrected.json()["lead_id"] == first.json()["lead_id"]
+    lead = client.portal.call(services.lead_store.get, first.json()["lead_id"])
+    assert len(lead.attribution_history) == 2
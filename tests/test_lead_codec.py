@@ -0,0 +1,77 @@
+"""Compact lead storage: short keys, binary UUIDs, dictionary encoding and legacy documents."""
+import uuid
+from datetime import datetime
+
+from bson import Binary
+
+from backend.models import LeadRecord
+from backend.services.lead_codec import LeadCodec
+
+
+def make_lead(**fields) -> LeadRecord:
+    values = {
+        "name": "Ana", "email": "ana@example.com", "whatsapp": "+5511999999999", "action_type": "demo",
+        "utm_data": {"utm_source": "google", "utm_medium": None, "gclid": "abc"},
+        "created_at": datetime(2024, 5, 1, 12, 0),
+        "attribution_history": [{"action_type": "demo", "source": "landing-whatsapp",
+                                 "utm": {"utm_source": "google"}, "created_at": datetime(2024, 5, 1, 12, 0)}],
+    }
+    values.update(fields)
+    return LeadRecord(**values)
+
+
+def test_round_trip_with_short_keys_and_binary_id():
+    codec = LeadCodec(dictionary_encode=True)
+    lead = make_lead()
+    document = codec.encode(lead)
+
+    assert isinstance(document["_id"], Binary)
+    assert document["_id"].as_uuid() == uuid.UUID(lead.id)
+    assert {"n", "e", "w", "a", "u", "t", "h"} <= set(document)
+    assert "name" not in document and "company" not in document  # Nulls are dropped
+    assert document["u"] == {"us": "google", "gc": "abc"}
+
+    decoded = codec.decode(document)
+    assert decoded.id == lead.id
+    assert decoded.utm_data == {"utm_source": "google", "gclid": "abc"}
+    assert decoded.attribution_history == [
+        {"action_type": "demo", "source": "landing-whatsapp", "utm": {"utm_source": "google"},
+         "created_at": datetime(2024, 5, 1, 12, 0)},
+    ]
+    assert decoded.dict(exclude={"utm_data"}) == lead.dict(exclude={"utm_data"})
+
+
+def test_dictionary_encoding_is_optional_and_decodes_either_way():
+    lead = make_lead(status="converted")
+    encoded = LeadCodec(dictionary_encode=True).encode(lead)
+    plain = LeadCodec(dictionary_encode=False).encode(lead)
+
+    assert (encoded["s"], encoded["a"], encoded["st"]) == (0, 1, 2)
+    assert (plain["s"], plain["a"], plain["st"]) == ("landing-whatsapp", "demo", "converted")
+    for document in (encoded, plain):
+        decoded = LeadCodec(dictionary_encode=True).decode(document)
+        assert (decoded.source, decoded.action_type, decoded.status) == ("landing-whatsapp", "demo", "converted")
+
+
+def test_unknown_dictionary_value_is_stored_as_is():
+    document = LeadCodec(dictionary_encode=True).encode(make_lead(source="partner-site"))
+    assert document["s"] == "partner-site"
+    assert LeadCodec().decode(document).source == "partner-site"
+
+
+def test_legacy_document_decodes():
+    lead_id = str(uuid.uuid4())
+    legacy = {
+        "_id": "65a0c0ffee0000000000abcd", "id": lead_id, "name": "Ana", "email": "ana@example.com",
+        "whatsapp": "+5511999999999", "company": None, "source": "landing-whatsapp", "action_type": "trial",
+        "utm_data": {"utm_source": "google", "utm_medium": None}, "created_at": datetime(2023, 1, 1),
+        "status": "active",
+    }
+    codec = LeadCodec()
+    assert codec.is_legacy(legacy)
+
+    decoded = codec.decode(legacy)
+    assert decoded.id == lead_id
+    assert decoded.email == "ana@example.com"
+    assert decoded.utm_data == {"utm_source": "google", "utm_medium": None}
+    assert not codec.is_legacy(codec.encode(decoded))
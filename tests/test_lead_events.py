@@ -0,0 +1,154 @@
+"""
+Lead webhook dispatcher: failed batches are dead-lettered before the
+checkpoint can pass them, targets checkpoint independently while the lease
+is kept, migrated leads aren't announced and the insert log resumes by
+position rather than by comparing client-generated ObjectIds.
+"""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.models import LeadRecord
+from backend.services.lead_codec import MIGRATED_FROM_KEY, lead_codec
+from backend.services.lead_events import (
+    CHANGE_STREAM_PIPELINE, INSERT_LOG_COLLECTION, LeadEventDispatcher, WebhookTarget,
+)
+
+
+class StubTarget(WebhookTarget):
+    def __init__(self, url: str, accept: bool):
+        super().__init__(url)
+        self.accept = accept
+        self.bodies = []
+
+    async def deliver(self, session, body: bytes, delivery_id: str) -> bool:
+        self.bodies.append(body)
+        return self.accept
+
+
+class HangingTarget(WebhookTarget):
+    """A blackholed receiver: deliveries never complete"""
+
+    async def deliver(self, session, body: bytes, delivery_id: str) -> bool:
+        await asyncio.Event().wait()
+        return False
+
+
+def make_batch():
+    return [{"id": "lead-1", "type": "lead.created", "occurred_at": datetime.utcnow(), "lead": {"id": "lead-1"}}]
+
+
+def test_delivered_batch_is_not_dead_lettered():
+    async def run():
+        db = AsyncMongoMockClient().db
+        target = StubTarget("http://a", True)
+        dispatcher = LeadEventDispatcher(db, None, [target])
+        assert await dispatcher._deliver(None, target, make_batch())
+        assert await dispatcher.dead_letters.count_documents({}) == 0
+
+    asyncio.run(run())
+
+
+def test_failed_batch_is_dead_lettered():
+    async def run():
+        db = AsyncMongoMockClient().db
+        target = StubTarget("http://b", False)
+        dispatcher = LeadEventDispatcher(db, None, [target])
+        assert not await dispatcher._deliver(None, target, make_batch())
+
+        letter = await dispatcher.dead_letters.find_one({})
+        assert letter["target"] == "http://b"
+        assert letter["event_ids"] == ["lead-1"]
+        assert dispatcher.metrics()["dead_lettered"] == 1
+
+    asyncio.run(run())
+
+
+def test_failed_batch_raises_when_dead_letter_cannot_be_stored():
+    class BrokenCollection:
+        async def insert_one(self, document):
+            raise ConnectionError("mongo down")
+
+    async def run():
+        db = AsyncMongoMockClient().db
+        target = StubTarget("http://a", False)
+        dispatcher = LeadEventDispatcher(db, None, [target])
+        dispatcher.dead_letters = BrokenCollection()
+        try:
+            await dispatcher._deliver(None, target, make_batch())
+        except ConnectionError:
+            return
+        raise AssertionError("a failed batch must not be reported as handled")
+
+    asyncio.run(run())
+
+
+def test_insert_log_resumes_after_position_in_insertion_order():
+    async def run():
+        db = AsyncMongoMockClient().db
+        log = db[INSERT_LOG_COLLECTION]
+        # ObjectIds from different workers don't sort in insertion order
+        ids = [ObjectId("%024x" % n) for n in (5, 9, 3, 7)]
+        for entry_id in ids:
+            await log.insert_one({"_id": entry_id, "d": {"id": str(entry_id)}})
+
+        dispatcher = LeadEventDispatcher(db, None, [])
+        queue: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(dispatcher._read_insert_log(queue, ids[1]))
+        await asyncio.sleep(0.1)
+        reader.cancel()
+
+        read = [queue.get_nowait()[0] for _ in range(queue.qsize())]
+        assert read == ids[2:]
+
+    asyncio.run(run())
+
+
+def test_blackholed_target_holds_back_only_its_own_checkpoint():
+    async def run():
+        db = AsyncMongoMockClient().db
+        log = db[INSERT_LOG_COLLECTION]
+        await log.insert_one({"_id": ObjectId(), "d": {"_id": "seen"}})
+
+        fast, stuck = StubTarget("http://fast", True), HangingTarget("http://stuck")
+        dispatcher = LeadEventDispatcher(db, None, [fast, stuck], source="insert_log")
+        dispatcher.batch_wait = 0.05
+        dispatcher.lease_seconds = 0.3
+        assert await dispatcher._acquire_lease()
+
+        dispatch = asyncio.create_task(dispatcher._dispatch())
+        await asyncio.sleep(0.1)
+        new_entry = ObjectId()
+        lead = LeadRecord(name="Ana", email="ana@example.com", whatsapp="+551133334444", action_type="trial")
+        await log.insert_one({"_id": new_entry, "d": lead_codec.encode(lead)})
+        # Longer than the lease: it must be renewed while the stuck delivery waits
+        await asyncio.sleep(1.5)
+
+        state = await dispatcher.state.find_one({"_id": "leads"})
+        assert not dispatch.done()
+        assert state["owner"] == dispatcher.owner
+        assert state["lease_until"] > datetime.utcnow()
+        assert len(fast.bodies) == 1
+        assert state["targets"][fast.key]["token"] == new_entry
+        assert stuck.key not in state["targets"]
+
+        dispatch.cancel()
+        await asyncio.gather(dispatch, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_change_stream_skips_migrated_leads():
+    async def run():
+        changes = AsyncMongoMockClient().db.changes
+        await changes.insert_many([
+            {"_id": 1, "operationType": "insert", "fullDocument": {"h": [{"a": 0}]}},
+            {"_id": 2, "operationType": "insert", "fullDocument": {"h": [{"a": 0, MIGRATED_FROM_KEY: "legacy-id"}]}},
+            {"_id": 3, "operationType": "update", "fullDocument": {"h": [{"a": 0}]}},
+        ])
+        matched = await changes.aggregate(CHANGE_STREAM_PIPELINE).to_list(None)
+        assert [change["_id"] for change in matched] == [1]
+
+    asyncio.run(run())
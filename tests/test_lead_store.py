@@ -0,0 +1,53 @@
+"""Lead deduplication on email and WhatsApp."""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.models import LeadRecord
+from backend.services.lead_store import LeadStore
+
+
+def make_lead(**fields) -> LeadRecord:
+    values = {"name": "Ana", "email": "ana@example.com", "whatsapp": "+5511999999999", "action_type": "trial"}
+    values.update(fields)
+    return LeadRecord(**values)
+
+
+def test_whatsapp_match_keeps_lead_and_records_submitted_email():
+    async def run():
+        store = LeadStore(AsyncMongoMockClient().db.leads)
+        await store.ensure_indexes()
+        original, created = await store.upsert(make_lead(company="Acme"))
+        assert created
+
+        merged, created = await store.upsert(make_lead(
+            name="Ana Souza", email="ana.souza@example.com", company="Other", action_type="demo",
+        ))
+        assert not created
+        assert merged.id == original.id
+        assert (merged.email, merged.name, merged.company, merged.action_type) == (
+            "ana@example.com", "Ana", "Acme", "trial",
+        )
+
+        touchpoint = merged.attribution_history[-1]
+        assert touchpoint["email"] == "ana.souza@example.com"
+        assert touchpoint["name"] == "Ana Souza"
+        assert touchpoint["company"] == "Other"
+        assert touchpoint["action_type"] == "demo"
+
+    asyncio.run(run())
+
+
+def test_email_match_refreshes_merge_fields():
+    async def run():
+        store = LeadStore(AsyncMongoMockClient().db.leads)
+        await store.ensure_indexes()
+        original, _ = await store.upsert(make_lead())
+
+        merged, created = await store.upsert(make_lead(name="Ana Souza", whatsapp="+5511988888888", action_type="demo"))
+        assert not created
+        assert merged.id == original.id
+        assert (merged.name, merged.action_type) == ("Ana Souza", "demo")
+        assert len(merged.attribution_history) == 2
+
+    asyncio.run(run())
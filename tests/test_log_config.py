@@ -0,0 +1,43 @@
+"""
+Logging setup: once configured, every record - including uvicorn's error and
+access logs - goes through the queue handler only, so nothing writes to the
+stream on the event loop.
+"""
+import logging
+import logging.config
+
+from uvicorn.config import LOGGING_CONFIG
+
+from backend.utils import log_config
+
+
+def handlers_reached(logger: logging.Logger):
+    """Handlers a record logged on `logger` is passed to, as in Logger.callHandlers"""
+    handlers = []
+    while logger is not None:
+        handlers.extend(logger.handlers)
+        if not logger.propagate:
+            break
+        logger = logger.parent
+    return handlers
+
+
+def test_request_path_loggers_only_reach_the_queue_handler():
+    root = logging.getLogger()
+    saved = list(root.handlers), root.level
+    try:
+        # What uvicorn does before importing the app
+        logging.config.dictConfig(LOGGING_CONFIG)
+        log_config.configure_logging()
+
+        queue_handlers = [h for h in root.handlers if isinstance(h, log_config.DeferredQueueHandler)]
+        assert len(queue_handlers) == 1
+        for name in log_config.UVICORN_LOGGERS + ["backend.routes.landings", "backend.middleware.capture"]:
+            assert handlers_reached(logging.getLogger(name)) == queue_handlers, name
+    finally:
+        log_config.stop_logging()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved[0]:
+            root.addHandler(handler)
+        root.setLevel(saved[1])
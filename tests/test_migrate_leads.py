@@ -0,0 +1,43 @@
+"""Legacy lead migration merges duplicates and can be re-run after a crash."""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.scripts.migrate_leads import migrate
+
+
+def legacy_lead(lead_id: str, email: str, created_at: datetime, **fields):
+    document = {
+        "_id": ObjectId(), "id": lead_id, "name": "Ana", "email": email, "whatsapp": "+5511999999999",
+        "company": None, "source": "landing-whatsapp", "action_type": "trial",
+        "utm_data": {"utm_source": "google", "utm_medium": None}, "created_at": created_at, "status": "active",
+    }
+    document.update(fields)
+    return document
+
+
+def test_migration_merges_duplicates_and_is_idempotent():
+    async def run():
+        collection = AsyncMongoMockClient().db.leads
+        first = legacy_lead("6f1c2a34-0f7e-4b8e-9a51-3c2d1e0f9a01", "Ana@Example.com", datetime(2024, 1, 1))
+        second = legacy_lead("6f1c2a34-0f7e-4b8e-9a51-3c2d1e0f9a02", "ana@example.com", datetime(2024, 2, 1),
+                             action_type="demo")
+        await collection.insert_many([dict(first), dict(second)])
+
+        await migrate(collection, batch_size=10, dry_run=False)
+        leads = await collection.find({}).to_list(10)
+        assert len(leads) == 1
+        assert len(leads[0]["h"]) == 2
+
+        # Crash after the upsert but before the delete: the legacy document is still there
+        await collection.insert_one(dict(second))
+        await migrate(collection, batch_size=10, dry_run=False)
+
+        leads = await collection.find({}).to_list(10)
+        assert len(leads) == 1
+        assert len(leads[0]["h"]) == 2
+        assert await collection.count_documents({"email": {"$exists": True}}) == 0
+
+    asyncio.run(run())
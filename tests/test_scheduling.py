@@ -0,0 +1,54 @@
+"""
+Demo slot validation in Brasília time: visitor timezones across a DST change,
+Easter-based holidays and the business hours window.
+"""
+from datetime import date, datetime, timezone
+
+import pytest
+
+from backend.utils.scheduling import easter_sunday, generate_slots, get_zone, validate_slot
+
+NOW = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)  # Monday
+
+
+def test_visitor_wall_clock_maps_across_a_dst_change():
+    # New York leaves EST (UTC-5) for EDT (UTC-4) on 2026-03-08; Brasília stays at UTC-3
+    before = datetime(2026, 3, 6, 7, 30)  # Friday 07:30 EST = 09:30 Brasília
+    after = datetime(2026, 3, 9, 7, 30)   # Monday 07:30 EDT = 08:30 Brasília
+    assert validate_slot(before, "America/New_York", now=NOW) == (True, None)
+    assert validate_slot(after, "America/New_York", now=NOW) == (False, 'business_hours_only')
+
+
+def test_generated_slots_follow_the_visitor_offset_across_a_dst_change():
+    slots = generate_slots(days=7, tz_name="America/New_York", now=NOW)
+    first_by_day = {}
+    for slot in slots:
+        first_by_day.setdefault(slot.date(), slot)
+
+    assert first_by_day[date(2026, 3, 6)].hour == 7  # 09:00 Brasília in EST
+    assert first_by_day[date(2026, 3, 9)].hour == 8  # 09:00 Brasília in EDT
+    assert first_by_day[date(2026, 3, 9)].tzinfo == get_zone("America/New_York")
+
+
+@pytest.mark.parametrize("year, easter", [(2024, date(2024, 3, 31)), (2025, date(2025, 4, 20)), (2026, date(2026, 4, 5))])
+def test_easter_sunday(year, easter):
+    assert easter_sunday(year) == easter
+
+
+@pytest.mark.parametrize("slot, now", [
+    (datetime(2026, 2, 17, 10, 0), datetime(2026, 2, 10, 12, 0, tzinfo=timezone.utc)),  # Carnival Tuesday
+    (datetime(2026, 4, 3, 10, 0), datetime(2026, 3, 20, 12, 0, tzinfo=timezone.utc)),   # Good Friday
+])
+def test_movable_holidays_are_rejected(slot, now):
+    assert validate_slot(slot, now=now) == (False, 'holiday_not_available')
+
+
+@pytest.mark.parametrize("hour, minute, expected", [
+    (8, 30, (False, 'business_hours_only')),
+    (9, 0, (True, None)),
+    (17, 30, (True, None)),
+    (17, 45, (False, 'business_hours_only')),  # The slot would end after 18:00
+    (18, 0, (False, 'business_hours_only')),
+])
+def test_business_hours(hour, minute, expected):
+    assert validate_slot(datetime(2026, 3, 4, hour, minute), now=NOW) == expected
@@ -0,0 +1,99 @@
+"""
+Shared rate-limit windows and dedupe claims against an injected
+fakeredis client, including the in-process fallback when it goes away.
+"""
+import asyncio
+
+import fakeredis
+
+from backend.services.rate_limiter import RateLimiter
+from backend.services.shared_state import SharedState
+
+
+def make_state(server=None) -> SharedState:
+    server = server or fakeredis.FakeServer()
+    return SharedState(client=fakeredis.FakeAsyncRedis(server=server))
+
+
+def test_window_allows_up_to_limit():
+    async def run():
+        state = make_state()
+        results = [await state.window_acquire("rl:ip:1.2.3.4", 3600, 3) for _ in range(4)]
+        assert results == [(True, 1), (True, 2), (True, 3), (False, 3)]
+        # Other keys have their own window
+        assert await state.window_acquire("rl:ip:5.6.7.8", 3600, 3) == (True, 1)
+
+    asyncio.run(run())
+
+
+def test_window_drops_expired_attempts():
+    async def run():
+        state = make_state()
+        key = state.prefix + "rl:ip:1.2.3.4"
+        # Two attempts recorded two hours ago are outside a one hour window
+        await state.client.zadd(key, {"old-1": 1000, "old-2": 2000})
+        assert await state.window_acquire("rl:ip:1.2.3.4", 3600, 2) == (True, 1)
+        assert await state.client.zcard(key) == 1
+
+    asyncio.run(run())
+
+
+def test_concurrent_checks_never_exceed_limit():
+    async def run():
+        limiter = RateLimiter(db_collection=None, shared_state=make_state())
+        results = await asyncio.gather(*[limiter.check_ip_rate_limit("1.2.3.4") for _ in range(20)])
+        allowed = [ok for ok, _ in results if ok]
+        assert len(allowed) == limiter.ip_max_attempts
+
+    asyncio.run(run())
+
+
+def test_workers_share_the_window():
+    async def run():
+        server = fakeredis.FakeServer()
+        first, second = make_state(server), make_state(server)
+        assert (await first.window_acquire("rl:email:a@b.co", 60, 1))[0]
+        assert not (await second.window_acquire("rl:email:a@b.co", 60, 1))[0]
+
+    asyncio.run(run())
+
+
+def test_claim_and_release():
+    async def run():
+        state = make_state()
+        assert await state.claim("dedupe:abc", 30) == (True, None)
+        assert await state.claim("dedupe:abc", 30) == (False, None)  # First request still in flight
+        await state.complete("dedupe:abc", '{"lead_id": "1"}', 30)
+        assert await state.claim("dedupe:abc", 30) == (False, '{"lead_id": "1"}')
+        await state.release("dedupe:abc")
+        assert await state.claim("dedupe:abc", 30) == (True, None)
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_in_process_state_on_error():
+    async def run():
+        server = fakeredis.FakeServer()
+        state = make_state(server)
+        server.connected = False
+
+        assert await state.window_acquire("rl:ip:1.2.3.4", 3600, 1) == (True, 1)
+        assert not state._available()
+        # Limits still apply per worker while the backend is down
+        assert await state.window_acquire("rl:ip:1.2.3.4", 3600, 1) == (False, 1)
+        assert await state.claim("dedupe:abc", 30) == (True, None)
+        await state.complete("dedupe:abc", "done", 30)
+        assert await state.claim("dedupe:abc", 30) == (False, "done")
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_allows_on_backend_error():
+    async def run():
+        server = fakeredis.FakeServer()
+        limiter = RateLimiter(db_collection=None, shared_state=make_state(server))
+        server.connected = False
+        assert await limiter.check_ip_rate_limit("1.2.3.4") == (True, None)
+        assert await limiter.check_email_rate_limit("a@b.co") == (True, None)
+
+    asyncio.run(run())
@@ -0,0 +1,102 @@
+"""Spam pre-filter: Bloom filter, reputation decay, User-Agent rules, client IP resolution and the middleware."""
+import asyncio
+
+import pytest
+
+from backend.middleware import spam_filter as spam_middleware
+from backend.middleware.spam_filter import SpamFilterMiddleware, parse_networks, resolve_client_ip
+from backend.services import spam_filter as spam_service
+from backend.services.spam_filter import BloomFilter, SpamFilter
+
+BROWSER_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36"
+PROXIES = parse_networks("10.0.0.0/8")
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    added = [f"spam-{i}.example" for i in range(1000)]
+    for value in added:
+        bloom.add(value)
+
+    assert all(value in bloom for value in added)
+    false_positives = sum(f"ham-{i}.example" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_check_email_matches_address_and_domain():
+    spam = SpamFilter(bad_values=["mailinator.com", "bot@example.org"])
+    assert spam.check_email("Someone@Mailinator.com") == (False, "bad_email")
+    assert spam.check_email("bot@example.org") == (False, "bad_email")
+    assert spam.check_email("ana@example.org") == (True, None)
+
+
+@pytest.mark.parametrize("user_agent", ["", "short", "curl/8.4.0", "python-requests/2.31", "Googlebot/2.1 (+http://www.google.com/bot.html)"])
+def test_bot_user_agents_are_rejected(user_agent):
+    assert SpamFilter().is_suspicious_user_agent(user_agent)
+
+
+def test_browser_user_agent_is_allowed():
+    assert not SpamFilter().is_suspicious_user_agent(BROWSER_UA)
+
+
+def test_reputation_blocks_then_decays(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(spam_service.time, "monotonic", lambda: clock[0])
+    spam = SpamFilter()
+
+    spam.penalize("203.0.113.7", "honeypot")
+    assert spam.check_request("203.0.113.7", BROWSER_UA) == (False, "bad_reputation")
+
+    # One half-life later the score is 5, below the threshold of 10
+    clock[0] += spam.half_life_seconds + spam.verdict_ttl_seconds
+    assert spam.check_request("203.0.113.7", BROWSER_UA) == (True, None)
+
+
+def test_bad_user_agent_is_checked_before_a_cached_verdict():
+    spam = SpamFilter()
+    assert spam.check_request("203.0.113.7", BROWSER_UA) == (True, None)
+    assert spam.check_request("203.0.113.7", "curl/8.4.0") == (False, "bad_user_agent")
+
+
+def test_forwarded_for_is_ignored_from_untrusted_peers():
+    assert resolve_client_ip("198.51.100.1", "203.0.113.50", PROXIES) == "198.51.100.1"
+
+
+def test_client_is_right_most_untrusted_hop():
+    # Client spoofed the first hop; the load balancer appended the real address
+    assert resolve_client_ip("10.0.0.2", "203.0.113.50, 198.51.100.1", PROXIES) == "198.51.100.1"
+    assert resolve_client_ip("10.0.0.2", "198.51.100.1, 10.0.0.3", PROXIES) == "198.51.100.1"
+    assert resolve_client_ip("10.0.0.2", "", PROXIES) == "10.0.0.2"
+
+
+async def call_middleware(headers, client=("10.0.0.2", 5000)):
+    # 10.0.0.2 is a load balancer under the default TRUSTED_PROXIES (private ranges)
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/landings/submit", "headers": headers, "client": client}
+    await SpamFilterMiddleware(app)(scope, None, send)
+    return sent[0]["status"], bool(calls)
+
+
+def test_middleware_rejects_bots_and_spoofed_forwarded_for_cannot_block_a_victim(monkeypatch):
+    spam = SpamFilter()
+    monkeypatch.setattr(spam_middleware, "spam_filter", spam)
+
+    bot_headers = [(b"user-agent", b"curl/8.4.0"), (b"x-forwarded-for", b"203.0.113.50, 198.51.100.9")]
+    for _ in range(3):
+        assert asyncio.run(call_middleware(bot_headers)) == (403, False)
+
+    # The attacker's own address is blocked, the spoofed victim is not
+    assert spam.check_request("198.51.100.9", BROWSER_UA) == (False, "bad_reputation")
+    victim_headers = [(b"user-agent", BROWSER_UA.encode()), (b"x-forwarded-for", b"203.0.113.50")]
+    assert asyncio.run(call_middleware(victim_headers)) == (200, True)
@@ -0,0 +1,40 @@
+"""
+Cold-start budgets for a worker: importing `server` must stay cheap (no
+clients built at import) and a fresh uvicorn process must answer liveness
+quickly. Budgets are generous so they only catch regressions such as eager
+Mongo/aiohttp imports or blocking work at import time.
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from backend.scripts.measure_startup import BACKEND_DIR, measure_first_request, measure_import
+
+IMPORT_BUDGET_SECONDS = float(os.environ.get('STARTUP_IMPORT_BUDGET', '3'))
+FIRST_REQUEST_BUDGET_SECONDS = float(os.environ.get('STARTUP_FIRST_REQUEST_BUDGET', '10'))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_import_server_within_budget():
+    durations = [measure_import() for _ in range(3)]
+    assert statistics.median(durations) < IMPORT_BUDGET_SECONDS
+
+
+def test_import_does_not_load_database_or_http_clients():
+    snippet = "import sys, server; print('loaded:' + ','.join(m for m in ('motor', 'aiohttp', 'redis') if m in sys.modules))"
+    output = subprocess.check_output([sys.executable, "-c", snippet], cwd=BACKEND_DIR, text=True)
+    assert output.strip().splitlines()[-1] == "loaded:"
+
+
+def test_liveness_answers_within_budget():
+    pytest.importorskip("uvicorn")
+    assert measure_first_request(free_port(), timeout=FIRST_REQUEST_BUDGET_SECONDS) < FIRST_REQUEST_BUDGET_SECONDS